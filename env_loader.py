@@ -0,0 +1,43 @@
+"""
+.env loading shared by the bot, its handlers and the Notion scripts (and the Notion client the scripts use).
+"""
+import os
+import logging
+import functools
+from dotenv import dotenv_values
+from notion_client import Client
+
+logger = logging.getLogger(__name__)
+
+@functools.cache
+def _parsed_env_file():
+    """Parse .env into a dict (read once per process; later calls reuse the result)."""
+    with open(".env", "r") as file:
+        parsed = dotenv_values(stream=file)
+    logger.info("Successfully loaded environment variables from .env file")
+    return parsed
+
+def load_env_file(*names):
+    """Load environment variables from .env file, without overriding variables that are already set.
+    
+    When all the given variable names are set already (e.g. on Heroku), .env is not read.
+    """
+    if names and all(os.environ.get(name) for name in names):
+        return
+    
+    try:
+        parsed = _parsed_env_file()
+    except Exception as e:
+        logger.error(f"Error loading .env file: {e}")
+        return
+    
+    # Set it in the environment in one update; variables without a value are skipped
+    os.environ.update({
+        key: value for key, value in parsed.items()
+        if value is not None and key not in os.environ
+    })
+
+@functools.lru_cache(maxsize=None)
+def get_notion_client(api_key):
+    """Get a Notion client for the API key, shared by every script run in this interpreter."""
+    return Client(auth=api_key)
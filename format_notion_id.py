@@ -1,17 +1,45 @@
 #!/usr/bin/env python3
 """
 Utility to format a Notion ID correctly with dashes.
+
+This is string handling only; don't decorate it with @numba.jit. Numba falls back
+to object mode on str and the JIT compile time would never pay for itself here.
 """
+import sys
+
+# Translation table that deletes dashes and stray whitespace in one C-level pass
+_STRIP_TRANS = str.maketrans('', '', '-_ \t\r\n')
+
+# Valid characters in a Notion ID (checked as a whole string, not one char at a time)
+_HEX_DIGITS = frozenset('0123456789abcdefABCDEF')
+
+# Prefixes of the .env line holding the parent page ID (comments never match)
+_PARENT_PAGE_ID_PREFIXES = ("NOTION_PARENT_PAGE_ID=", "NOTION_PARENT_PAGE_ID =")
 
 def format_notion_id(id_str):
-    """Format a Notion ID by inserting dashes in the correct positions."""
-    # Remove any existing dashes and non-hex characters
-    clean_id = ''.join(c for c in id_str if c.isalnum())
+    """Format a Notion ID by inserting dashes in the correct positions (ValueError if it isn't one)."""
+    # Fast path: an ID already in the canonical 8-4-4-4-12 form is returned as-is
+    # rather than being taken apart and glued back together
+    if (len(id_str) == 36 and id_str[8] == '-' and id_str[13] == '-'
+            and id_str[18] == '-' and id_str[23] == '-'
+            and _HEX_DIGITS.issuperset(id_str.replace('-', '', 4))):
+        return id_str
     
-    # Check if we have the right length (32 characters)
+    # Fast path: IDs copied from Notion URLs are usually already 32 characters,
+    # so avoid filtering character by character
+    if len(id_str) == 32 and id_str.isalnum():
+        clean_id = id_str
+    else:
+        # Remove any existing dashes and whitespace; other characters are left for the hex check
+        clean_id = id_str.translate(_STRIP_TRANS)
+    
+    # Check if we have the right length (32 characters); dashes can't fix any other length
     if len(clean_id) != 32:
-        print(f"⚠️ Warning: Expected 32 characters, but got {len(clean_id)}")
-        print("This might not be a valid Notion ID.")
+        raise ValueError(f"Not a valid Notion ID, expected 32 characters but got {len(clean_id)}: {id_str}")
+    
+    # Notion IDs are hexadecimal, anything else can't be fixed by adding dashes
+    if not _HEX_DIGITS.issuperset(clean_id):
+        raise ValueError(f"Not a valid Notion ID, contains non-hex characters: {id_str}")
     
     # Insert dashes in the correct positions (8-4-4-4-12 format)
     formatted_id = f"{clean_id[:8]}-{clean_id[8:12]}-{clean_id[12:16]}-{clean_id[16:20]}-{clean_id[20:]}"
@@ -24,23 +52,31 @@ if __name__ == "__main__":
     print("This utility formats a Notion ID by inserting dashes in the correct positions (8-4-4-4-12 format).")
     print("Example: 1cab9534753980cc8de6f88c0a2c19f4 → 1cab9534-7539-80cc-8de6-f88c0a2c19f4\n")
     
-    # Try to get the ID from the .env file first
+    # Read the .env file once; the same lines are reused if the ID gets updated
+    env_lines = []
+    env_index = None
     try:
         with open(".env", "r") as f:
-            env_content = f.read()
-            for line in env_content.split('\n'):
-                if "NOTION_PARENT_PAGE_ID" in line and "=" in line:
-                    _, value = line.split("=", 1)
-                    original_id = value.strip()
-                    print(f"Found ID in .env file: {original_id}")
-                    break
-            else:
-                original_id = input("Enter your Notion page ID: ")
-    except:
+            env_lines = f.readlines()
+    except OSError:
+        pass
+    
+    # Try to get the ID from the .env file first
+    for index, line in enumerate(env_lines):
+        if line.startswith(_PARENT_PAGE_ID_PREFIXES):
+            env_index = index
+            original_id = line.partition("=")[2].strip()
+            print(f"Found ID in .env file: {original_id}")
+            break
+    else:
         original_id = input("Enter your Notion page ID: ")
     
     # Format the ID
-    formatted_id = format_notion_id(original_id)
+    try:
+        formatted_id = format_notion_id(original_id)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
     
     print(f"\nOriginal ID: {original_id}")
     print(f"Formatted ID: {formatted_id}")
@@ -49,22 +85,18 @@ if __name__ == "__main__":
     update_env = input("\nUpdate NOTION_PARENT_PAGE_ID in .env file? (y/n): ").lower()
     if update_env == 'y':
         try:
-            with open(".env", "r") as f:
-                env_content = f.read()
-            
-            # Replace the ID
-            updated_content = []
-            for line in env_content.split('\n'):
-                if "NOTION_PARENT_PAGE_ID" in line and "=" in line:
-                    key, _ = line.split("=", 1)
-                    updated_line = f"{key}={formatted_id}"
-                    updated_content.append(updated_line)
-                else:
-                    updated_content.append(line)
+            # Replace the ID, or add it if the file didn't have one yet
+            updated_line = f"NOTION_PARENT_PAGE_ID={formatted_id}\n"
+            if env_index is not None:
+                env_lines[env_index] = updated_line
+            else:
+                if env_lines and not env_lines[-1].endswith('\n'):
+                    env_lines[-1] += '\n'
+                env_lines.append(updated_line)
             
             # Write the updated content
             with open(".env", "w") as f:
-                f.write('\n'.join(updated_content))
+                f.writelines(env_lines)
             
             print("✅ Updated .env file with formatted ID.")
         except Exception as e:
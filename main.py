@@ -1,4 +1,10 @@
 #!/usr/bin/env python3
+"""
+X to Notion bot: finds URLs in a message, analyzes them with OpenAI and saves them to Notion.
+
+The per-message hot path is string/regex work around network I/O; keep it out of
+@numba.jit (Numba has no fast path for str and its compile time would not pay back).
+"""
 import os
 import re
 import json
@@ -7,12 +13,15 @@ import telegram
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 import asyncio
+import signal
 import sys
 import argparse
+from urllib.parse import urlsplit
+from env_loader import load_env_file
 
 # Import custom handlers
-from notion_handler import NotionHandler
-from openai_handler import OpenAIHandler
+from notion_handler import NotionHandler, close_http_client, DEFAULT_TWEET_EMOJI, DEFAULT_WEBSITE_EMOJI
+from openai_handler import OpenAIHandler, close_openai_clients, preconnect_openai_client
 
 # Set up logging
 logging.basicConfig(
@@ -24,40 +33,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Load environment variables manually
-def load_env_file():
-    """Load environment variables from .env file manually."""
-    try:
-        with open(".env", "r") as file:
-            for line in file:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                key, value = line.split('=', 1)
-                key = key.strip()
-                value = value.strip()
-                
-                # Set it in the environment
-                os.environ[key] = value
-        
-        logger.info("Successfully loaded environment variables from .env file")
-    except Exception as e:
-        logger.error(f"Error loading .env file: {e}")
-
-# Load environment variables
-load_env_file()
+# Load environment variables (.env is not read when these are all set already, e.g. on Heroku)
+load_env_file("TELEGRAM_BOT_TOKEN", "NOTION_DATABASE_ID")
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
 
-# URL patterns
-TWITTER_URL_PATTERN = r'https?://(?:www\.)?(?:twitter\.com|x\.com)/[^/\s]+/status/\d+'
-GENERAL_URL_PATTERN = r'https?://(?:www\.)?[\w.-]+\.[a-zA-Z]{2,}(?:/\S*)?'
+# URL patterns (compiled once so each message skips the re module's cache lookup)
+TWITTER_URL_RE = re.compile(r'https?://(?:www\.)?(?:twitter\.com|x\.com)/[^/\s]+/status/\d+')
+GENERAL_URL_RE = re.compile(r'https?://(?:www\.)?[\w.-]+\.[a-zA-Z]{2,}(?:/\S*)?')
+TWITTER_HOSTS = frozenset({'twitter.com', 'www.twitter.com', 'x.com', 'www.x.com'})
 
 # Initialize handlers
 notion_handler = None
 openai_handler = None
 
+# Maximum number of URLs from one message processed at the same time (keeps OpenAI/Notion rate limits happy)
+MAX_CONCURRENT_URLS = 4
+_url_semaphore = asyncio.Semaphore(MAX_CONCURRENT_URLS)
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Send a message when the command /start is issued."""
     user = update.effective_user
@@ -124,10 +117,11 @@ async def process_message(update=None, context=None, text=None):
     local_openai_handler = openai_handler or OpenAIHandler()
     
     # Determine message text source
-    if update and hasattr(update, 'message') and update.message:
+    msg = getattr(update, 'message', None) if update is not None else None
+    processing_message = None
+    if msg is not None:
         # Called from Telegram
-        message_text = update.message.text
-        processing_message = None
+        message_text = msg.text
     else:
         # Called from command line or elsewhere
         message_text = text
@@ -136,71 +130,77 @@ async def process_message(update=None, context=None, text=None):
             return False
     
     try:
-        # First, check for Twitter/X URLs
-        twitter_urls = re.findall(TWITTER_URL_PATTERN, message_text)
-        
-        # Then, check for general website URLs (exclude anything that could be a Twitter URL)
+        # Scan the message once and sort each URL into Twitter/X posts or general websites
+        twitter_urls = []
         general_urls = []
-        for url in re.findall(GENERAL_URL_PATTERN, message_text):
-            # Check if this URL is related to Twitter/X
-            if 'twitter.com' in url or 'x.com' in url:
-                # Extract the base Twitter URL if this is a Twitter URL with parameters
-                base_twitter_url = re.search(r'(https?://(?:www\.)?(?:twitter\.com|x\.com)/[^/\s]+/status/\d+)', url)
-                if base_twitter_url and base_twitter_url.group(1) in twitter_urls:
-                    # This is a Twitter URL we already have, so skip it
+        for match in GENERAL_URL_RE.finditer(message_text):
+            url = match.group(0)
+            # Twitter/X status URLs (possibly with parameters) are reduced to their base URL
+            if urlsplit(url).netloc.lower() in TWITTER_HOSTS:
+                base_twitter_url = TWITTER_URL_RE.match(url)
+                if base_twitter_url:
+                    twitter_urls.append(base_twitter_url.group(0))
                     continue
             
-            # Not a Twitter URL we've already found
+            # Not a Twitter/X status URL
             general_urls.append(url)
         
         if not twitter_urls and not general_urls:
             logger.info("No URLs found in message.")
-            if update and hasattr(update, 'message') and update.message:
-                await update.message.reply_text("No URL found in your message. Please send a valid URL.")
+            if msg is not None:
+                await msg.reply_text("No URL found in your message. Please send a valid URL.")
             return False
         
         # Let the user know we're processing if in Telegram
-        if update and hasattr(update, 'message') and update.message:
+        if msg is not None:
             urls_to_process = twitter_urls + general_urls
             first_url = urls_to_process[0] if urls_to_process else "URL"
-            processing_message = await update.message.reply_text(f"Processing URL: {first_url} ⏳")
+            processing_message = await msg.reply_text(f"Processing URL: {first_url} ⏳")
+        
+        # Check all URLs against the database in one go
+        saved_urls = await local_notion_handler.urls_exist(twitter_urls + general_urls)
         
-        results = []
+        # Process Twitter/X and general website URLs concurrently, a few at a time
+        async def process_limited(process_url, url, kind):
+            async with _url_semaphore:
+                logger.info(f"Processing {kind} URL: {url}")
+                return await process_url(url, local_notion_handler, local_openai_handler, update, processing_message,
+                                         already_saved=saved_urls.get(url))
         
-        # Process Twitter/X URLs
-        for url in twitter_urls:
-            logger.info(f"Processing Twitter URL: {url}")
-            result = await process_twitter_url(url, local_notion_handler, local_openai_handler, update, processing_message)
-            if result:
-                results.append(result)
+        results = await asyncio.gather(
+            *(process_limited(process_twitter_url, url, "Twitter") for url in twitter_urls),
+            *(process_limited(process_website_url, url, "general website") for url in general_urls),
+            return_exceptions=True
+        )
         
-        # Process general website URLs
-        for url in general_urls:
-            logger.info(f"Processing general website URL: {url}")
-            result = await process_website_url(url, local_notion_handler, local_openai_handler, update, processing_message)
-            if result:
-                results.append(result)
+        for url, result in zip(twitter_urls + general_urls, results):
+            if isinstance(result, Exception):
+                logger.error(f"Unhandled error processing {url}: {result}")
         
         return True
     
     except Exception as e:
         logger.error(f"Error processing message: {e}")
-        if update and hasattr(update, 'message') and update.message:
-            await update.message.reply_text(f"Sorry, an error occurred while processing your request: {str(e)}")
+        if msg is not None:
+            await msg.reply_text(f"Sorry, an error occurred while processing your request: {str(e)}")
         return False
     finally:
         # Ensure cleanup happens if we created new handlers
         if local_openai_handler != openai_handler:
             await local_openai_handler.close()
 
-async def process_twitter_url(url, notion_handler, openai_handler, update=None, processing_message=None):
-    """Process a Twitter/X URL."""
+async def process_twitter_url(url, notion_handler, openai_handler, update=None, processing_message=None, already_saved=None):
+    """Process a Twitter/X URL (already_saved skips the database check when the caller has done it)."""
+    msg = getattr(update, 'message', None) if update is not None else None
+    
     try:
         # First check if the URL already exists in the database
-        if await notion_handler.url_exists_in_database(url):
+        if already_saved is None:
+            already_saved = await notion_handler.url_exists_in_database(url)
+        if already_saved:
             logger.info(f"Tweet URL already exists in database: {url}")
-            if update and hasattr(update, 'message') and update.message:
-                await update.message.reply_text(f"This tweet is already saved in your Notion database: {url}")
+            if msg is not None:
+                await msg.reply_text(f"This tweet is already saved in your Notion database: {url}")
             return None
         
         # Get tweet data using OpenAI
@@ -208,8 +208,8 @@ async def process_twitter_url(url, notion_handler, openai_handler, update=None,
         
         if not tweet_data:
             logger.warning(f"Failed to analyze tweet: {url}")
-            if update and hasattr(update, 'message') and update.message:
-                await update.message.reply_text("Sorry, I couldn't analyze that tweet. Please try again later.")
+            if msg is not None:
+                await msg.reply_text("Sorry, I couldn't analyze that tweet. Please try again later.")
             return None
         
         # Update processing message if in Telegram
@@ -223,7 +223,7 @@ async def process_twitter_url(url, notion_handler, openai_handler, update=None,
         mapped_category = notion_handler.map_to_preferred_category(tweet_data["category"])
         
         # Get emoji for the tweet
-        emoji = tweet_data.get("emoji", "🐦")
+        emoji = tweet_data.get("emoji", DEFAULT_TWEET_EMOJI)
         
         # Create Notion entry
         entry_id = await notion_handler.create_tweet_entry(tweet_data, url)
@@ -232,13 +232,21 @@ async def process_twitter_url(url, notion_handler, openai_handler, update=None,
             logger.info(f"Successfully created Notion entry for tweet: {url}")
             
             # If in Telegram, send a nicely formatted response
-            if update and hasattr(update, 'message') and update.message:
+            if msg is not None:
                 # Extract tweet data for the message
                 extracted_tweet = tweet_data.get("extracted_tweet", {})
                 tweet_author = extracted_tweet.get("author", "Unknown")
                 tweet_content = extracted_tweet.get("content", "Content not available")
                 tweet_stats = extracted_tweet.get("stats", {})
                 
+                # Look up the analysis fields once
+                title = tweet_data.get("title", "")
+                importance = tweet_data.get("importance", "?")
+                summary = tweet_data.get("summary", "")
+                key_points = tweet_data.get("key_points")
+                action_items = tweet_data.get("action_items")
+                personal_reflection = tweet_data.get("personal_reflection")
+                
                 stats_text = ""
                 if tweet_stats:
                     stats_parts = []
@@ -254,75 +262,78 @@ async def process_twitter_url(url, notion_handler, openai_handler, update=None,
                 
                 # Format key points as bullet points if available
                 key_points_text = ""
-                if "key_points" in tweet_data and tweet_data["key_points"]:
+                if key_points:
                     key_points_text = "\n\n📋 <b>Key Points:</b>"
-                    if isinstance(tweet_data["key_points"], list):
-                        for point in tweet_data["key_points"]:
-                            key_points_text += f"\n• {point}"
+                    if isinstance(key_points, list):
+                        key_points_text += "\n• " + "\n• ".join(map(str, key_points))
                     else:
-                        key_points_text += f"\n{tweet_data['key_points']}"
+                        key_points_text += f"\n{key_points}"
                 
                 # Format action items if available
                 action_items_text = ""
-                if "action_items" in tweet_data and tweet_data["action_items"]:
+                if action_items:
                     action_items_text = "\n\n🎯 <b>Action Items:</b>"
-                    if isinstance(tweet_data["action_items"], list):
-                        for item in tweet_data["action_items"]:
-                            action_items_text += f"\n• {item}"
+                    if isinstance(action_items, list):
+                        action_items_text += "\n• " + "\n• ".join(map(str, action_items))
                     else:
-                        action_items_text += f"\n{tweet_data['action_items']}"
+                        action_items_text += f"\n{action_items}"
                 
                 # Add personal reflection if available
                 personal_reflection_text = ""
-                if "personal_reflection" in tweet_data and tweet_data["personal_reflection"]:
-                    personal_reflection_text = f"\n\n💭 <b>Personal Reflection:</b>\n{tweet_data['personal_reflection']}"
+                if personal_reflection:
+                    personal_reflection_text = f"\n\n💭 <b>Personal Reflection:</b>\n{personal_reflection}"
                 
-                # Build the complete message
-                message = (
-                    f"✅ Tweet successfully analyzed and saved to Notion!\n\n"
-                    f"{emoji} <b>{tweet_data['title']}</b>\n\n"
-                )
+                # Build the complete message from parts and join once
+                parts = [
+                    "✅ Tweet successfully analyzed and saved to Notion!\n\n",
+                    f"{emoji} <b>{title}</b>\n\n"
+                ]
                 
                 # Add a note if the analysis was based on limited information
                 if tweet_data.get("confident") is False:
-                    message += f"⚠️ <i>Note: Analysis based on limited information as tweet content couldn't be fully extracted</i>\n\n"
+                    parts.append("⚠️ <i>Note: Analysis based on limited information as tweet content couldn't be fully extracted</i>\n\n")
                 
-                message += (
-                    f"👤 <b>Author:</b> {tweet_author}\n"
-                    f"🏷️ <b>Category:</b> {mapped_category}\n"
-                    f"📊 <b>Importance:</b> {tweet_data['importance']}/10{stats_text}\n\n"
-                    f"<b>Tweet Content:</b>\n{tweet_content[:300]}{'...' if len(tweet_content) > 300 else ''}\n\n"
-                    f"📝 <b>Summary:</b> {tweet_data['summary']}"
-                    f"{key_points_text}"
-                    f"{action_items_text}"
-                    f"{personal_reflection_text}\n\n"
+                parts.extend([
+                    f"👤 <b>Author:</b> {tweet_author}\n",
+                    f"🏷️ <b>Category:</b> {mapped_category}\n",
+                    f"📊 <b>Importance:</b> {importance}/10{stats_text}\n\n",
+                    f"<b>Tweet Content:</b>\n{tweet_content[:300]}{'...' if len(tweet_content) > 300 else ''}\n\n",
+                    f"📝 <b>Summary:</b> {summary}",
+                    key_points_text,
+                    action_items_text,
+                    f"{personal_reflection_text}\n\n",
                     f"🔗 <a href='{notion_handler.get_database_url()}'>View in Notion</a>"
-                )
+                ])
+                message = "".join(parts)
                 
                 # Send the message with HTML formatting
-                await update.message.reply_html(message)
+                await msg.reply_html(message)
             
             return entry_id
         else:
             logger.warning(f"Failed to create Notion entry for tweet: {url}")
-            if update and hasattr(update, 'message') and update.message:
-                await update.message.reply_text("Sorry, I couldn't save to Notion. Please check your API keys and database ID.")
+            if msg is not None:
+                await msg.reply_text("Sorry, I couldn't save to Notion. Please check your API keys and database ID.")
             return None
     
     except Exception as e:
         logger.error(f"Error processing Twitter URL {url}: {e}")
-        if update and hasattr(update, 'message') and update.message:
-            await update.message.reply_text(f"Error processing tweet: {str(e)}")
+        if msg is not None:
+            await msg.reply_text(f"Error processing tweet: {str(e)}")
         return None
 
-async def process_website_url(url, notion_handler, openai_handler, update=None, processing_message=None):
-    """Process a general website URL."""
+async def process_website_url(url, notion_handler, openai_handler, update=None, processing_message=None, already_saved=None):
+    """Process a general website URL (already_saved skips the database check when the caller has done it)."""
+    msg = getattr(update, 'message', None) if update is not None else None
+    
     try:
         # First check if the URL already exists in the database
-        if await notion_handler.url_exists_in_database(url):
+        if already_saved is None:
+            already_saved = await notion_handler.url_exists_in_database(url)
+        if already_saved:
             logger.info(f"Website URL already exists in database: {url}")
-            if update and hasattr(update, 'message') and update.message:
-                await update.message.reply_text(f"This website is already saved in your Notion database: {url}")
+            if msg is not None:
+                await msg.reply_text(f"This website is already saved in your Notion database: {url}")
             return None
         
         # Get website data using OpenAI
@@ -330,8 +341,8 @@ async def process_website_url(url, notion_handler, openai_handler, update=None,
         
         if not website_data:
             logger.warning(f"Failed to analyze website: {url}")
-            if update and hasattr(update, 'message') and update.message:
-                await update.message.reply_text("Sorry, I couldn't analyze that website. Please try again later.")
+            if msg is not None:
+                await msg.reply_text("Sorry, I couldn't analyze that website. Please try again later.")
             return None
         
         # Update processing message if in Telegram
@@ -345,7 +356,7 @@ async def process_website_url(url, notion_handler, openai_handler, update=None,
         mapped_category = notion_handler.map_to_preferred_category(website_data.get("category", "Other"))
         
         # Get emoji for the website
-        emoji = website_data.get("emoji", "🔗")
+        emoji = website_data.get("emoji", DEFAULT_WEBSITE_EMOJI)
         
         # Create Notion entry
         entry_id = await notion_handler.create_website_entry(website_data, url)
@@ -354,8 +365,8 @@ async def process_website_url(url, notion_handler, openai_handler, update=None,
             logger.info(f"Successfully created Notion entry for website: {url}")
             
             # If in Telegram, send a nicely formatted response
-            if update and hasattr(update, 'message') and update.message:
-                await update.message.reply_html(
+            if msg is not None:
+                await msg.reply_html(
                     f"✅ Website successfully analyzed and saved to Notion!\n\n"
                     f"{emoji} <b>{website_data['title']}</b>\n\n"
                     f"🌐 <b>URL:</b> {url}\n"
@@ -369,14 +380,14 @@ async def process_website_url(url, notion_handler, openai_handler, update=None,
             return entry_id
         else:
             logger.warning(f"Failed to create Notion entry for website: {url}")
-            if update and hasattr(update, 'message') and update.message:
-                await update.message.reply_text("Sorry, I couldn't save to Notion. Please check your API keys and database ID.")
+            if msg is not None:
+                await msg.reply_text("Sorry, I couldn't save to Notion. Please check your API keys and database ID.")
             return None
     
     except Exception as e:
         logger.error(f"Error processing website URL {url}: {e}")
-        if update and hasattr(update, 'message') and update.message:
-            await update.message.reply_text(f"Error processing website: {str(e)}")
+        if msg is not None:
+            await msg.reply_text(f"Error processing website: {str(e)}")
         return None
 
 async def main_cli():
@@ -388,22 +399,38 @@ async def main_cli():
     
     args = parser.parse_args()
     
-    if args.bot:
-        await run_telegram_bot()
-    elif args.message:
-        await process_message(text=args.message)
-    elif args.file:
-        try:
-            with open(args.file, 'r') as f:
-                urls = f.readlines()
-            
-            for url in urls:
-                await process_message(text=url.strip())
-        except Exception as e:
-            logger.error(f"Error processing file: {e}")
-    else:
-        logger.error("Either --message, --file, or --bot must be provided.")
-        parser.print_help()
+    try:
+        if args.bot:
+            await run_telegram_bot()
+        elif args.message:
+            await process_message(text=args.message)
+        elif args.file:
+            await process_file(args.file)
+        else:
+            logger.error("Either --message, --file, or --bot must be provided.")
+            parser.print_help()
+    finally:
+        # Close the Notion and OpenAI connection pools shared by all handlers
+        await close_http_client()
+        await close_openai_clients()
+
+async def process_file(path):
+    """Process a file of URLs, one per line, sharing one set of handlers across all lines."""
+    global notion_handler, openai_handler
+    
+    # Reuse the handlers so the browser and the saved-URL cache survive from one line to the next
+    notion_handler = NotionHandler()
+    openai_handler = OpenAIHandler()
+    try:
+        with open(path, 'r') as f:
+            urls = f.readlines()
+        
+        for url in urls:
+            await process_message(text=url.strip())
+    except Exception as e:
+        logger.error(f"Error processing file: {e}")
+    finally:
+        await openai_handler.close()
 
 async def run_telegram_bot():
     """Start the Telegram bot."""
@@ -425,22 +452,26 @@ async def run_telegram_bot():
     # Run the bot until the user presses Ctrl-C
     logger.info("Starting bot...")
     try:
-        # Initialize the application first
-        await application.initialize()
+        # Initialize the application first, opening the OpenAI connection meanwhile so the
+        # first message doesn't wait for the TLS handshake
+        await asyncio.gather(application.initialize(), preconnect_openai_client())
         await application.start()
         # Start polling for updates
         await application.updater.start_polling(poll_interval=1200)  # Set poll interval to 1200 seconds (20 minutes)
         
         # Keep the bot running until stopped
         logger.info("Bot is running. Press Ctrl+C to stop.")
-        # Wait for bot to run until user interrupts
-        running = True
-        while running:
+        # Sleep until SIGINT/SIGTERM sets the stop event instead of waking up to poll
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
             try:
-                await asyncio.sleep(1)
-            except KeyboardInterrupt:
-                running = False
-                logger.info("Keyboard interrupt received, shutting down...")
+                loop.add_signal_handler(sig, stop_event.set)
+            except NotImplementedError:
+                # Signal handlers aren't available on Windows event loops; Ctrl+C still raises KeyboardInterrupt
+                pass
+        await stop_event.wait()
+        logger.info("Shutdown signal received, shutting down...")
     except KeyboardInterrupt:
         logger.info("Keyboard interrupt received, shutting down...")
     except Exception as e:
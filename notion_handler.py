@@ -1,46 +1,425 @@
 import os
+import re
+import json
+import asyncio
 import logging
+import time
+import random
 import datetime
-from notion_client import Client
+import functools
+import unicodedata
+import httpx
+from notion_client import AsyncClient
+from notion_client.errors import APIErrorCode, APIResponseError, HTTPResponseError, RequestTimeoutError
+from env_loader import load_env_file
 
-logger = logging.getLogger(__name__)
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-# Load environment variables manually
-def load_env_file():
-    """Load environment variables from .env file manually."""
-    try:
-        with open(".env", "r") as file:
-            for line in file:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                key, value = line.split('=', 1)
-                key = key.strip()
-                value = value.strip()
-                
-                # Set it in the environment
-                os.environ[key] = value
-        
-        logger.debug("Successfully loaded environment variables from .env file")
-    except Exception as e:
-        logger.error(f"Error loading .env file: {e}")
+logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_env_file()
+# Load environment variables (.env is not read when these are all set already, e.g. on Heroku)
+load_env_file("NOTION_API_KEY", "NOTION_DATABASE_ID")
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
 NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
 
+# Maximum number of open connections to the Notion API (shared by all handlers)
+NOTION_MAX_CONNECTIONS = 10
+
+# Timeout for a single Notion API request, in milliseconds
+NOTION_TIMEOUT_MS = 30000
+
+# Notion allows an average of about 3 requests per second per integration
+NOTION_REQUESTS_PER_SECOND = 3
+
+# HTTP/2 connection pools shared by every NotionHandler, one per API key (notion_client puts
+# the Authorization header on the httpx client itself), created on first use
+_http_clients = {}
+
+class _RateLimiter:
+    """Token bucket used as an httpx request hook, so every Notion request waits its turn."""
+    
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or rate
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def __call__(self, request):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+class _OrjsonAsyncClient(httpx.AsyncClient):
+    """httpx client that encodes JSON request bodies with orjson instead of the stdlib json."""
+    
+    def build_request(self, method, url, *, json=None, headers=None, **kwargs):
+        if json is not None:
+            headers = httpx.Headers(headers)
+            headers["Content-Type"] = "application/json"
+            kwargs["content"] = orjson.dumps(json)
+        return super().build_request(method, url, headers=headers, **kwargs)
+
+def _get_http_client(api_key):
+    """Get the shared HTTP client for the Notion API, creating it if needed."""
+    if api_key not in _http_clients:
+        # Page payloads are big nested block lists, so use orjson for them when it's installed
+        client_class = _OrjsonAsyncClient if orjson is not None else httpx.AsyncClient
+        _http_clients[api_key] = client_class(
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=NOTION_MAX_CONNECTIONS,
+                max_keepalive_connections=NOTION_MAX_CONNECTIONS
+            ),
+            # Rate limit per API key, shared by all handlers, so concurrent work doesn't hit 429s
+            event_hooks={"request": [_RateLimiter(NOTION_REQUESTS_PER_SECOND)]}
+        )
+    return _http_clients[api_key]
+
+async def close_http_client():
+    """Close the shared Notion HTTP clients (call once on shutdown)."""
+    while _http_clients:
+        _, client = _http_clients.popitem()
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.error(f"Error closing Notion HTTP client: {e}")
+
+# Retries for writes (creating pages, updating databases) when Notion is rate limiting
+# or briefly unavailable
+NOTION_WRITE_ATTEMPTS = 5
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRY_DELAY = 30
+
+# How long (in seconds) a fetched database schema is reused before asking Notion again
+SCHEMA_TTL = 300
+
+# Databases already known to have the enhanced properties, kept across runs so /setup
+# doesn't have to ask Notion again; entries are trusted for SETUP_STATE_TTL seconds
+SETUP_STATE_PATH = os.path.join(os.path.expanduser("~"), ".xtonotion", "schema_state.json")
+SETUP_STATE_TTL = 24 * 60 * 60
+
+# Properties the database must have, and ones used for enhanced summaries
+REQUIRED_PROPERTIES = ("Title", "URL", "Category", "Summary", "Importance")
+RECOMMENDED_PROPERTIES = ("Key Points", "Action Items", "Personal Reflection", "Author", "Emoji")
+
+# Enhanced properties added by setup_enhanced_properties (Author is added separately,
+# as a people or rich_text property depending on the database)
+ENHANCED_PROPERTY_SCHEMA = {
+    "Key Points": {"rich_text": {}},
+    "Action Items": {"rich_text": {}},
+    "Personal Reflection": {"rich_text": {}},
+    "Emoji": {"rich_text": {}}
+}
+_AUTHOR_PEOPLE_SCHEMA = {"people": {}}
+_AUTHOR_TEXT_SCHEMA = {"rich_text": {}}
+
+# What to tell the user when setting up the properties fails with one of these Notion errors
+_SETUP_ERROR_MESSAGES = {
+    APIErrorCode.ObjectNotFound: "Database not found. Check NOTION_DATABASE_ID and that the database is shared with your integration.",
+    APIErrorCode.Unauthorized: "Notion rejected the API key. Check NOTION_API_KEY.",
+    APIErrorCode.RestrictedResource: "The integration doesn't have permission to edit this database.",
+    APIErrorCode.RateLimited: "Notion is rate limiting requests, try again in a minute."
+}
+
+# Bit flags for which of the recommended properties the database has (see _get_schema)
+KEY_POINTS_BIT = 1 << 0
+ACTION_ITEMS_BIT = 1 << 1
+PERSONAL_REFLECTION_BIT = 1 << 2
+AUTHOR_BIT = 1 << 3
+EMOJI_BIT = 1 << 4
+_PROPERTY_BITS = dict(zip(RECOMMENDED_PROPERTIES, (KEY_POINTS_BIT, ACTION_ITEMS_BIT, PERSONAL_REFLECTION_BIT, AUTHOR_BIT, EMOJI_BIT)))
+REQUIRED_PROPERTIES_SET = frozenset(REQUIRED_PROPERTIES)
+RECOMMENDED_PROPERTIES_SET = frozenset(RECOMMENDED_PROPERTIES)
+
+# Emoji used when the AI analysis doesn't suggest one
+DEFAULT_TWEET_EMOJI = "🐦"
+DEFAULT_WEBSITE_EMOJI = "🔗"
+
+# Preferred categories, in priority order
+PREFERRED_CATEGORIES = [
+    "VibeCoding Help",
+    "Cool AI",
+    "Ecommerce", 
+    "Business Ideas",
+    "Cool Tool",
+    "App Idea", 
+    "Ios Development"
+]
+
+# Keywords to match for each category
+CATEGORY_KEYWORDS = {
+    "VibeCoding Help": ["coding", "vibecoding", "programming", "developer", "software", "web development", "html", "css", "javascript", "python", "java"],
+    "Cool AI": ["ai", "openai", "genai", "chatgpt", "artificial intelligence", "machine learning", "deep learning", "nlp", "gpt", "model", "neural", "llm"],
+    "Ecommerce": ["ecommerce", "e-commerce", "shop", "shopify", "webshop", "shopping", "marketplace", "retail", "retailer", "online store", "commerce"],
+    "Business Ideas": ["business", "startup", "entrepreneur", "entrepreneurship", "idea", "venture", "opportunity", "market", "marketing"],
+    "Cool Tool": ["tool", "toolkit", "toolbox", "tooling", "utility", "productivity", "automation", "service", "platform"],
+    "App Idea": ["app", "webapp", "application", "mobile", "concept", "idea"],
+    "Ios Development": ["ios", "swift", "swiftui", "apple", "iphone", "ipad", "xcode", "mobile development", "app development"]
+}
+
+# Words as they're split out of a category name (and out of the keywords above)
+_WORD_RE = re.compile(r"[a-z0-9+#]+")
+
+# Preferred categories by their lowercase name, for the exact-match check
+_PREFERRED_BY_LOWER = {category.lower(): category for category in PREFERRED_CATEGORIES}
+
+def _build_keyword_index():
+    """Index every category keyword by its words, so the input is scanned only once."""
+    word_index, phrase_index = {}, {}
+    for category_index, keywords in enumerate(CATEGORY_KEYWORDS.values()):
+        for keyword in keywords:
+            parts = _WORD_RE.findall(keyword.lower())
+            if len(parts) == 1:
+                word_index.setdefault(parts[0], []).append(category_index)
+            elif parts:
+                phrase_index.setdefault(" ".join(parts), []).append(category_index)
+    return (
+        {word: tuple(indexes) for word, indexes in word_index.items()},
+        {phrase: tuple(indexes) for phrase, indexes in phrase_index.items()}
+    )
+
+# Single-word keywords -> category indexes, and multi-word phrases -> category indexes
+_KEYWORD_INDEX, _PHRASE_INDEX = _build_keyword_index()
+_CATEGORY_NAMES = tuple(CATEGORY_KEYWORDS)
+
+# Single-word keywords -> the category they map to on their own (the earliest one on ties)
+_KEYWORD_TO_CATEGORY = {word: _CATEGORY_NAMES[indexes[0]] for word, indexes in _KEYWORD_INDEX.items()}
+
+# All multi-word phrases as one regex over the space-joined words of the input; the
+# lookahead lets phrases that share words (e.g. "mobile app development") all be found
+_PHRASE_RE = re.compile(
+    r"(?<!\S)(?=(" + "|".join(map(re.escape, sorted(_PHRASE_INDEX, key=len, reverse=True))) + r")(?!\S))"
+)
+
+# Typographic punctuation the AI sometimes uses, mapped to its ASCII equivalent
+_PUNCTUATION_TRANS = str.maketrans({
+    "\u2010": "-", "\u2011": "-", "\u2012": "-", "\u2013": "-", "\u2014": "-", "\u2015": "-",
+    "\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"'
+})
+
+def _normalize_category(ai_category):
+    """Normalize a category for matching: NFKC, casefolded, ASCII punctuation, single spaces."""
+    normalized = unicodedata.normalize("NFKC", ai_category).casefold().translate(_PUNCTUATION_TRANS)
+    return " ".join(normalized.split())
+
+@functools.lru_cache(maxsize=1024)
+def _match_category(normalized):
+    """Find the preferred category for a normalized AI category, or None if nothing matches.
+    
+    Cached: the AI suggests the same few categories over and over.
+    """
+    # Check for exact matches first (one hashed lookup, no per-category lower())
+    category = _PREFERRED_BY_LOWER.get(normalized)
+    if category is not None:
+        return category
+    
+    # Short answers like "AI" or "Mobile" are often a keyword themselves
+    category = _KEYWORD_TO_CATEGORY.get(normalized)
+    if category:
+        return category
+    
+    # Check for keyword matches on whole words, so "ai" doesn't match "said" or "main";
+    # a trailing plural "s" is ignored so "tools" still counts as "tool". Compound words
+    # (e.g. "openai", "shopify", "marketing") only match when they're keywords themselves.
+    # One pass over the words plus one regex scan for phrases, collecting each
+    # distinct (category, keyword) hit
+    words = _WORD_RE.findall(normalized)
+    matched = set()
+    for word in words:
+        for candidate in (word, word[:-1]) if len(word) > 3 and word.endswith("s") else (word,):
+            for category_index in _KEYWORD_INDEX.get(candidate, ()):
+                matched.add((category_index, candidate))
+    if len(words) > 1:
+        for phrase in _PHRASE_RE.findall(" ".join(words)):
+            for category_index in _PHRASE_INDEX[phrase]:
+                matched.add((category_index, phrase))
+    
+    # The category with the most matching keywords wins (ties go to the earlier category)
+    if matched:
+        scores = [0] * len(_CATEGORY_NAMES)
+        for category_index, _ in matched:
+            scores[category_index] += 1
+        return _CATEGORY_NAMES[max(range(len(scores)), key=scores.__getitem__)]
+    
+    return None
+
+def _text(content, bold=False, url=None):
+    """Build a rich text item for a Notion block."""
+    text = {"type": "text", "text": {"content": content}}
+    if url:
+        text["text"]["link"] = {"url": url}
+    if bold:
+        text["annotations"] = {"bold": True}
+    return text
+
+def _block(block_type, *rich_text):
+    """Build a Notion block of the given type (paragraph, heading_2, ...) from rich text items."""
+    return {"object": "block", "type": block_type, block_type: {"rich_text": list(rich_text)}}
+
+def _paragraph(content, bold=False):
+    """Build a paragraph block with a single piece of text."""
+    return _block("paragraph", _text(content, bold=bold))
+
+def _bullet(content):
+    """Build a bulleted list item block."""
+    return _block("bulleted_list_item", _text(content))
+
+def _rich_text_property(content):
+    """Build the value of a rich_text database property."""
+    return {"rich_text": [{"text": {"content": content}}]}
+
+def _as_list(value):
+    """Normalize an AI-provided field to a list of strings (a single value becomes one item)."""
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    return [str(value)] if value else []
+
+def _bullet_text(items):
+    """Format a list as "• item" lines for a rich_text property."""
+    return "\n• " + "\n• ".join(items)
+
+def _original_url_block(url):
+    """Build the bold "Original URL:" paragraph that links back to the source."""
+    return _block("paragraph", _text("Original URL: ", bold=True), _text(url, url=url))
+
+# Static section headings, built once and reused for every page (never mutated)
+_HEADING_TWEET_CONTENT = _block("heading_2", _text("Tweet Content"))
+_HEADING_WEBSITE_DETAILS = _block("heading_2", _text("Website Details"))
+_HEADING_KEY_POINTS = _block("heading_3", _text("Key Points"))
+_HEADING_ACTION_ITEMS = _block("heading_3", _text("Action Items"))
+_HEADING_PERSONAL_REFLECTION = _block("heading_3", _text("Personal Reflection"))
+
+class _LazyJoin:
+    """Comma-joins a list only when a log message actually gets formatted."""
+    __slots__ = ("items",)
+    
+    def __init__(self, items):
+        self.items = items
+    
+    def __str__(self):
+        return ", ".join(self.items)
+
+def _load_setup_state():
+    """Read the saved setup state ({key: timestamp}), or an empty dict if there isn't any."""
+    try:
+        with open(SETUP_STATE_PATH, "r") as file:
+            state = json.load(file)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _save_setup_state(state):
+    """Write the setup state, logging (but otherwise ignoring) any error."""
+    try:
+        os.makedirs(os.path.dirname(SETUP_STATE_PATH), exist_ok=True)
+        with open(SETUP_STATE_PATH, "w") as file:
+            json.dump(state, file)
+    except OSError as e:
+        logger.warning(f"Could not save setup state: {e}")
+
 class NotionHandler:
+    # Fixed attribute set; new attributes must be added here and set in __init__
+    __slots__ = (
+        "api_key", "database_id", "client",
+        "_db_schema", "_db_schema_ts", "_prop_flags", "_validation",
+        "_seen_urls", "_date_str", "_date_expiry"
+    )
+    
     def __init__(self, api_key=None, database_id=None):
         """Initialize the Notion handler with API key and database ID."""
         self.api_key = api_key or NOTION_API_KEY
         self.database_id = database_id or NOTION_DATABASE_ID
-        self.client = Client(auth=self.api_key)
+        # Async client so Notion calls don't block the event loop, on the shared keep-alive pool
+        self.client = AsyncClient(auth=self.api_key, client=_get_http_client(self.api_key), timeout_ms=NOTION_TIMEOUT_MS)
+        # Cached database property types by name, refreshed after SCHEMA_TTL seconds
+        self._db_schema = None
+        self._db_schema_ts = 0
+        # Which recommended properties the cached schema has
+        self._prop_flags = 0
+        # Last structure check as (schema, result), reused while the schema is unchanged
+        self._validation = None
+        # URLs known to be saved in the database (found by a query or saved through this
+        # handler); only these skip Notion, any other URL is looked up every time
+        self._seen_urls = set()
+        # Today's date as an ISO string, and when (in epoch seconds) it goes stale
+        self._date_str = None
+        self._date_expiry = 0
+    
+    async def _get_schema(self, ttl=SCHEMA_TTL):
+        """Get the database property types by name, fetching them from Notion only when the cache is stale."""
+        if self._db_schema is None or time.monotonic() - self._db_schema_ts > ttl:
+            db = await self._with_retry(self.client.databases.retrieve, database_id=self.database_id)
+            self._set_schema(db["properties"])
+        return self._db_schema
+    
+    def _set_schema(self, props):
+        """Cache the database property types, along with which recommended ones exist."""
+        # Only the name and type of each property are used, so the rest of the
+        # (much bigger) property objects isn't kept around
+        self._db_schema = {name: prop["type"] for name, prop in props.items()}
+        self._prop_flags = 0
+        for name, bit in _PROPERTY_BITS.items():
+            if name in props:
+                self._prop_flags |= bit
+        self._db_schema_ts = time.monotonic()
+    
+    def invalidate_schema(self):
+        """Forget the cached database properties, e.g. after changing the database."""
+        self._db_schema = None
+    
+    async def _create_page(self, properties, children):
+        """Create a page in the database, retrying on rate limits and server errors."""
+        # A timed-out create may still have saved the page, so retrying it could save it twice
+        return await self._with_retry(
+            self.client.pages.create,
+            retry_timeouts=False,
+            parent={"database_id": self.database_id},
+            properties=properties,
+            children=children
+        )
+    
+    async def _with_retry(self, endpoint, retry_timeouts=True, **kwargs):
+        """Call a Notion endpoint, retrying on rate limits, server errors and (if retry_timeouts) timeouts."""
+        for attempt in range(NOTION_WRITE_ATTEMPTS):
+            try:
+                return await endpoint(**kwargs)
+            except (HTTPResponseError, RequestTimeoutError) as e:
+                # HTTPResponseError covers APIResponseError and the non-JSON bodies of gateway errors
+                status = getattr(e, "status", None)
+                if attempt == NOTION_WRITE_ATTEMPTS - 1 or (status is not None and status not in RETRY_STATUSES):
+                    raise
+                if status is None and not retry_timeouts:
+                    raise
+                
+                # Honor Notion's Retry-After, otherwise back off exponentially with jitter
+                retry_after = e.headers.get("Retry-After") if status is not None else None
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    delay = 2 ** attempt + random.random()
+                delay = min(delay, MAX_RETRY_DELAY)
+                
+                logger.warning(f"Notion request failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
     
     async def create_tweet_entry(self, tweet_data, tweet_url):
         """Create a new entry in the Notion database for a tweet."""
+        # Start fetching the schema (if it isn't cached) while the page content is built
+        schema_task = asyncio.ensure_future(self._get_schema())
         try:
+            # Yield once so the task sends its request before the synchronous work below
+            await asyncio.sleep(0)
+            
             # Extract tweet content if available
             extracted_tweet = tweet_data.get("extracted_tweet", {})
             tweet_content = extracted_tweet.get("content", "Content not available")
@@ -50,11 +429,17 @@ class NotionHandler:
             mapped_category = self.map_to_preferred_category(tweet_data["category"])
             
             # Get emoji if available, default to a generic one if not
-            emoji = tweet_data.get("emoji", "🐦")
+            emoji = tweet_data.get("emoji", DEFAULT_TWEET_EMOJI)
             
             # Include emoji in the title for better visual categorization
             title_with_emoji = f"{emoji} {tweet_data['title']}"
             
+            # Format the bullet lists as property text once, up front
+            key_points = _as_list(tweet_data.get("key_points"))
+            action_items = _as_list(tweet_data.get("action_items"))
+            key_points_text = _bullet_text(key_points) if key_points else None
+            action_items_text = _bullet_text(action_items) if action_items else None
+            
             # Basic properties that all databases should have
             properties = {
                 "Title": {
@@ -74,75 +459,59 @@ class NotionHandler:
                         "name": mapped_category
                     }
                 },
-                "Summary": {
-                    "rich_text": [
-                        {
-                            "text": {
-                                "content": tweet_data["summary"]
-                            }
-                        }
-                    ]
-                },
+                "Summary": _rich_text_property(tweet_data["summary"]),
                 "Importance": {
                     "number": int(tweet_data["importance"])
                 }
             }
             
+            # Create page blocks
+            page_blocks = [
+                _HEADING_TWEET_CONTENT,
+                _paragraph(f"Author: {tweet_author}", bold=True),
+                _paragraph(tweet_content)
+            ]
+            
+            # Add Key Points section to page content if available
+            if key_points:
+                page_blocks.append(_HEADING_KEY_POINTS)
+                page_blocks.extend(_bullet(point) for point in key_points)
+            
+            # Add Action Items section if available
+            if action_items:
+                page_blocks.append(_HEADING_ACTION_ITEMS)
+                page_blocks.extend(_bullet(item) for item in action_items)
+            
+            # Add Personal Reflection section if available
+            if "personal_reflection" in tweet_data:
+                page_blocks.extend([
+                    _HEADING_PERSONAL_REFLECTION,
+                    _paragraph(tweet_data["personal_reflection"])
+                ])
+            
+            # Add the Original URL block
+            page_blocks.append(_original_url_block(tweet_url))
+            
             # Check if the database has the enhanced properties and add them if they exist
             try:
-                db = self.client.databases.retrieve(self.database_id)
+                props = await schema_task
+                flags = self._prop_flags
                 
                 # Add Key Points if the property exists
-                if "Key Points" in db["properties"] and "key_points" in tweet_data:
-                    # Format bullet points as a string
-                    if isinstance(tweet_data["key_points"], list):
-                        key_points_text = "\n• " + "\n• ".join(tweet_data["key_points"])
-                    else:
-                        key_points_text = str(tweet_data["key_points"])
-                    
-                    properties["Key Points"] = {
-                        "rich_text": [
-                            {
-                                "text": {
-                                    "content": key_points_text
-                                }
-                            }
-                        ]
-                    }
+                if flags & KEY_POINTS_BIT and key_points_text is not None:
+                    properties["Key Points"] = _rich_text_property(key_points_text)
                 
                 # Add Action Items if the property exists
-                if "Action Items" in db["properties"] and "action_items" in tweet_data:
-                    # Format action items as a string
-                    if isinstance(tweet_data["action_items"], list):
-                        action_items_text = "\n• " + "\n• ".join(tweet_data["action_items"])
-                    else:
-                        action_items_text = str(tweet_data["action_items"])
-                    
-                    properties["Action Items"] = {
-                        "rich_text": [
-                            {
-                                "text": {
-                                    "content": action_items_text
-                                }
-                            }
-                        ]
-                    }
+                if flags & ACTION_ITEMS_BIT and action_items_text is not None:
+                    properties["Action Items"] = _rich_text_property(action_items_text)
                 
                 # Add Personal Reflection if the property exists
-                if "Personal Reflection" in db["properties"] and "personal_reflection" in tweet_data:
-                    properties["Personal Reflection"] = {
-                        "rich_text": [
-                            {
-                                "text": {
-                                    "content": tweet_data["personal_reflection"]
-                                }
-                            }
-                        ]
-                    }
+                if flags & PERSONAL_REFLECTION_BIT and "personal_reflection" in tweet_data:
+                    properties["Personal Reflection"] = _rich_text_property(tweet_data["personal_reflection"])
                 
                 # Add Emoji property if it exists
-                if "Emoji" in db["properties"]:
-                    emoji_type = db["properties"]["Emoji"]["type"]
+                if flags & EMOJI_BIT:
+                    emoji_type = props["Emoji"]
                     if emoji_type == "rich_text":
                         properties["Emoji"] = {
                             "rich_text": [
@@ -163,312 +532,154 @@ class NotionHandler:
                 logger.error(f"Error adding enhanced properties: {e}")
                 # Continue without the enhanced properties if there's an error
             
-            # Create page blocks
-            page_blocks = [
-                {
-                    "object": "block",
-                    "type": "heading_2",
-                    "heading_2": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": "Tweet Content"
-                                }
-                            }
-                        ]
-                    }
-                },
-                {
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": f"Author: {tweet_author}"
-                                },
-                                "annotations": {
-                                    "bold": True
-                                }
-                            }
-                        ]
-                    }
-                },
-                {
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": tweet_content
-                                }
-                            }
-                        ]
-                    }
-                }
-            ]
-            
-            # Add Key Points section to page content if available
-            if "key_points" in tweet_data:
-                page_blocks.append({
-                    "object": "block",
-                    "type": "heading_3",
-                    "heading_3": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": "Key Points"
-                                }
-                            }
-                        ]
-                    }
-                })
-                
-                # Add each key point as a bulleted list item
-                if isinstance(tweet_data["key_points"], list):
-                    for point in tweet_data["key_points"]:
-                        page_blocks.append({
-                            "object": "block",
-                            "type": "bulleted_list_item",
-                            "bulleted_list_item": {
-                                "rich_text": [
-                                    {
-                                        "type": "text",
-                                        "text": {
-                                            "content": point
-                                        }
-                                    }
-                                ]
-                            }
-                        })
-                else:
-                    # If not a list, add as paragraph
-                    page_blocks.append({
-                        "object": "block",
-                        "type": "paragraph",
-                        "paragraph": {
-                            "rich_text": [
-                                {
-                                    "type": "text",
-                                    "text": {
-                                        "content": str(tweet_data["key_points"])
-                                    }
-                                }
-                            ]
-                        }
-                    })
-            
-            # Add Action Items section if available
-            if "action_items" in tweet_data:
-                page_blocks.append({
-                    "object": "block",
-                    "type": "heading_3",
-                    "heading_3": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": "Action Items"
-                                }
-                            }
-                        ]
-                    }
-                })
-                
-                # Add each action item as a bulleted list item
-                if isinstance(tweet_data["action_items"], list):
-                    for item in tweet_data["action_items"]:
-                        page_blocks.append({
-                            "object": "block",
-                            "type": "bulleted_list_item",
-                            "bulleted_list_item": {
-                                "rich_text": [
-                                    {
-                                        "type": "text",
-                                        "text": {
-                                            "content": item
-                                        }
-                                    }
-                                ]
-                            }
-                        })
-                else:
-                    # If not a list, add as paragraph
-                    page_blocks.append({
-                        "object": "block",
-                        "type": "paragraph",
-                        "paragraph": {
-                            "rich_text": [
-                                {
-                                    "type": "text",
-                                    "text": {
-                                        "content": str(tweet_data["action_items"])
-                                    }
-                                }
-                            ]
-                        }
-                    })
-            
-            # Add Personal Reflection section if available
-            if "personal_reflection" in tweet_data:
-                page_blocks.append({
-                    "object": "block",
-                    "type": "heading_3",
-                    "heading_3": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": "Personal Reflection"
-                                }
-                            }
-                        ]
-                    }
-                })
-                
-                page_blocks.append({
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": tweet_data["personal_reflection"]
-                                }
-                            }
-                        ]
-                    }
-                })
-            
-            # Add the Original URL block
-            page_blocks.append({
-                "object": "block",
-                "type": "paragraph",
-                "paragraph": {
-                    "rich_text": [
-                        {
-                            "type": "text",
-                            "text": {
-                                "content": "Original URL: "
-                            },
-                            "annotations": {
-                                "bold": True
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": {
-                                "content": tweet_url,
-                                "link": {
-                                    "url": tweet_url
-                                }
-                            }
-                        }
-                    ]
-                }
-            })
-            
             # Create the page with properties and content
-            response = self.client.pages.create(
-                parent={"database_id": self.database_id},
-                properties=properties,
-                children=page_blocks
-            )
+            response = await self._create_page(properties, page_blocks)
             
             logger.info(f"Successfully created Notion entry: {response['url']}")
+            self._remember_url(tweet_url)
             return response
         except Exception as e:
             logger.error(f"Error creating Notion entry: {e}")
             return None
+        finally:
+            # Don't leave the fetch running, or its error unretrieved, if we failed before using it
+            if not schema_task.done():
+                schema_task.cancel()
+            elif not schema_task.cancelled():
+                schema_task.exception()
+    
+    async def create_tweet_entries(self, entries, concurrency=NOTION_MAX_CONNECTIONS):
+        """Create Notion entries for many (tweet_data, tweet_url) pairs concurrently.
+        
+        Entries can be a normal or an async iterable. They are fed to a fixed pool of
+        workers through a bounded queue, so only a few pages are being built at a time.
+        Returns the results in the same order as the input, None for entries that failed.
+        """
+        queue = asyncio.Queue(maxsize=concurrency * 4)
+        results = []
+        
+        async def worker():
+            while True:
+                index, tweet_data, tweet_url = await queue.get()
+                try:
+                    results[index] = await self.create_tweet_entry(tweet_data, tweet_url)
+                finally:
+                    queue.task_done()
+        
+        async def submit(tweet_data, tweet_url):
+            # Waits while the queue is full, which keeps a long import from running ahead
+            results.append(None)
+            await queue.put((len(results) - 1, tweet_data, tweet_url))
+        
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            if hasattr(entries, "__aiter__"):
+                async for tweet_data, tweet_url in entries:
+                    await submit(tweet_data, tweet_url)
+            else:
+                for tweet_data, tweet_url in entries:
+                    await submit(tweet_data, tweet_url)
+            
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        
+        return results
     
     async def check_database_structure(self):
         """Check if the Notion database has the required structure."""
         try:
-            db = self.client.databases.retrieve(self.database_id)
-            required_properties = ["Title", "URL", "Category", "Summary", "Importance"]
-            recommended_properties = ["Key Points", "Action Items", "Personal Reflection", "Author", "Emoji"]
-            missing_properties = []
-            missing_recommended = []
-            
-            for prop in required_properties:
-                if prop not in db["properties"]:
-                    missing_properties.append(prop)
-            
-            for prop in recommended_properties:
-                if prop not in db["properties"]:
-                    missing_recommended.append(prop)
-            
-            # Check property types
-            if not missing_properties:
-                property_checks = [
-                    # Title should be a title property
-                    ("Title", "title"),
-                    # URL should be a URL property
-                    ("URL", "url"),
-                    # Category should be a select property
-                    ("Category", "select"),
-                    # Summary should be a rich_text property
-                    ("Summary", "rich_text"),
-                    # Importance should be a number property
-                    ("Importance", "number")
-                ]
-                
-                if "Key Points" in db["properties"]:
-                    property_checks.append(("Key Points", "rich_text"))
-                if "Action Items" in db["properties"]:
-                    property_checks.append(("Action Items", "rich_text"))
-                if "Personal Reflection" in db["properties"]:
-                    property_checks.append(("Personal Reflection", "rich_text"))
-                
-                # For Author, we accept multiple types
-                if "Author" in db["properties"]:
-                    author_type = db["properties"]["Author"]["type"]
-                    if author_type not in ["rich_text", "people", "select"]:
-                        logger.warning(f"Author property is of type '{author_type}', which may not be fully supported. Recommended: 'rich_text', 'people', or 'select'")
-                
-                # For Emoji, we accept multiple types
-                if "Emoji" in db["properties"]:
-                    emoji_type = db["properties"]["Emoji"]["type"]
-                    if emoji_type not in ["rich_text", "select"]:
-                        logger.warning(f"Emoji property is of type '{emoji_type}', which may not be fully supported. Recommended: 'rich_text' or 'select'")
-                
-                type_issues = []
-                for prop_name, expected_type in property_checks:
-                    actual_type = db["properties"][prop_name]["type"]
-                    if actual_type != expected_type:
-                        type_issues.append(f"{prop_name} should be type '{expected_type}' but is '{actual_type}'")
-                
-                if type_issues:
-                    logger.warning(f"Property type issues in Notion database: {', '.join(type_issues)}")
-                    return False, type_issues
-            
-            if missing_properties:
-                logger.warning(f"Missing required properties in Notion database: {', '.join(missing_properties)}")
-                return False, missing_properties
+            props = await self._get_schema()
             
-            if missing_recommended:
-                logger.info(f"Missing recommended properties in Notion database: {', '.join(missing_recommended)}")
-                # We don't return False for missing recommended properties
+            # The schema cache hands back the same object until it's refetched, so an
+            # identical object means the structure hasn't changed since the last check
+            if self._validation is not None and self._validation[0] is props:
+                return self._validation[1]
             
-            logger.info("Notion database structure validated successfully")
-            return True, []
+            result = self._validate_structure(props)
+            self._validation = (props, result)
+            return result
         except Exception as e:
             logger.error(f"Error checking Notion database: {e}")
             return False, [f"Could not access database: {str(e)}"]
     
+    def _validate_structure(self, props):
+        """Validate the database properties, returning (valid, problems)."""
+        # Set differences find what's missing; the tuples keep the reporting order stable
+        missing = REQUIRED_PROPERTIES_SET - props.keys()
+        missing_properties = [prop for prop in REQUIRED_PROPERTIES if prop in missing]
+        missing = RECOMMENDED_PROPERTIES_SET - props.keys()
+        missing_recommended = [prop for prop in RECOMMENDED_PROPERTIES if prop in missing]
+        
+        # Check property types
+        if not missing_properties:
+            property_checks = [
+                # Title should be a title property
+                ("Title", "title"),
+                # URL should be a URL property
+                ("URL", "url"),
+                # Category should be a select property
+                ("Category", "select"),
+                # Summary should be a rich_text property
+                ("Summary", "rich_text"),
+                # Importance should be a number property
+                ("Importance", "number")
+            ]
+            
+            if "Key Points" in props:
+                property_checks.append(("Key Points", "rich_text"))
+            if "Action Items" in props:
+                property_checks.append(("Action Items", "rich_text"))
+            if "Personal Reflection" in props:
+                property_checks.append(("Personal Reflection", "rich_text"))
+            
+            # For Author, we accept multiple types
+            if "Author" in props:
+                author_type = props["Author"]
+                if author_type not in ["rich_text", "people", "select"]:
+                    logger.warning(f"Author property is of type '{author_type}', which may not be fully supported. Recommended: 'rich_text', 'people', or 'select'")
+            
+            # For Emoji, we accept multiple types
+            if "Emoji" in props:
+                emoji_type = props["Emoji"]
+                if emoji_type not in ["rich_text", "select"]:
+                    logger.warning(f"Emoji property is of type '{emoji_type}', which may not be fully supported. Recommended: 'rich_text' or 'select'")
+            
+            type_issues = []
+            for prop_name, expected_type in property_checks:
+                actual_type = props[prop_name]
+                if actual_type != expected_type:
+                    type_issues.append(f"{prop_name} should be type '{expected_type}' but is '{actual_type}'")
+            
+            if type_issues:
+                logger.warning(f"Property type issues in Notion database: {', '.join(type_issues)}")
+                return False, type_issues
+        
+        if missing_properties:
+            logger.warning(f"Missing required properties in Notion database: {', '.join(missing_properties)}")
+            return False, missing_properties
+        
+        if missing_recommended:
+            logger.info(f"Missing recommended properties in Notion database: {', '.join(missing_recommended)}")
+            # We don't return False for missing recommended properties
+        
+        logger.info("Notion database structure validated successfully")
+        return True, []
+    
     def get_database_url(self):
         """Get the URL of the Notion database."""
         return f"https://notion.so/{self.database_id.replace('-', '')}"
     
     def get_current_date(self):
         """Get the current date in ISO format for Notion."""
-        return datetime.datetime.now().date().isoformat()
+        # The string only changes at midnight, so format it once a day
+        if time.time() >= self._date_expiry:
+            today = datetime.date.today()
+            self._date_str = today.isoformat()
+            self._date_expiry = time.mktime((today + datetime.timedelta(days=1)).timetuple())
+        return self._date_str
     
     async def create_website_entry(self, website_data, page_url=None):
         """Create a new website entry in Notion."""
@@ -480,7 +691,7 @@ class NotionHandler:
             author = website_data.get("author", "Unknown")
             
             # Get emoji if available, default to a generic one if not
-            emoji = website_data.get("emoji", "🔗")
+            emoji = website_data.get("emoji", DEFAULT_WEBSITE_EMOJI)
             
             # Include emoji in the title for better visual categorization
             title_with_emoji = f"{emoji} {website_data.get('title', 'Unknown Website')}"
@@ -506,11 +717,12 @@ class NotionHandler:
             
             # Check the database to determine the type of Author property
             try:
-                db = self.client.databases.retrieve(self.database_id)
+                props = await self._get_schema()
+                flags = self._prop_flags
                 
                 # Add Author property only if it exists in the database
-                if "Author" in db["properties"]:
-                    author_type = db["properties"]["Author"]["type"]
+                if flags & AUTHOR_BIT:
+                    author_type = props["Author"]
                     
                     # Format Author property based on its type
                     if author_type == "people":
@@ -540,8 +752,8 @@ class NotionHandler:
                         logger.warning(f"Author property is type '{author_type}', which is not supported for automatic population")
                 
                 # Add Emoji property if it exists in the database
-                if "Emoji" in db["properties"]:
-                    emoji_type = db["properties"]["Emoji"]["type"]
+                if flags & EMOJI_BIT:
+                    emoji_type = props["Emoji"]
                     if emoji_type == "rich_text":
                         properties["Emoji"] = {
                             "rich_text": [
@@ -564,111 +776,34 @@ class NotionHandler:
             
             # Add description as rich text
             description = website_data.get("description", "")
-            use_cases = website_data.get("use_cases", [])
-            alternatives = website_data.get("alternatives", [])
+            use_cases = _as_list(website_data.get("use_cases"))
+            alternatives = _as_list(website_data.get("alternatives"))
             website_type = website_data.get("type", "Resource")
             
             # Format use cases and alternatives for rich text
-            use_cases_text = "\n".join([f"- {uc}" for uc in use_cases]) if isinstance(use_cases, list) else use_cases
-            alternatives_text = "\n".join([f"- {alt}" for alt in alternatives]) if isinstance(alternatives, list) else alternatives
+            use_cases_text = "\n".join([f"- {uc}" for uc in use_cases])
+            alternatives_text = "\n".join([f"- {alt}" for alt in alternatives])
             
             # Combine all information
             combined_text = f"{description}\n\n**Type:** {website_type}\n\n**Use Cases:**\n{use_cases_text}\n\n**Alternatives:**\n{alternatives_text}"
             
             # Create page blocks
             page_blocks = [
-                {
-                    "object": "block",
-                    "type": "heading_2",
-                    "heading_2": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": "Website Details"
-                                }
-                            }
-                        ]
-                    }
-                },
-                {
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [
-                            {
-                                "type": "text",
-                                "text": {
-                                    "content": combined_text
-                                }
-                            }
-                        ]
-                    }
-                }
+                _HEADING_WEBSITE_DETAILS,
+                _paragraph(combined_text),
+                # Add Author as a block in the content instead
+                _block("paragraph", _text("Created by: ", bold=True), _text(author)),
+                # Add URL block
+                _original_url_block(page_url or "")
             ]
             
-            # Add Author as a block in the content instead
-            page_blocks.append({
-                "object": "block",
-                "type": "paragraph",
-                "paragraph": {
-                    "rich_text": [
-                        {
-                            "type": "text",
-                            "text": {
-                                "content": "Created by: "
-                            },
-                            "annotations": {
-                                "bold": True
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": {
-                                "content": author
-                            }
-                        }
-                    ]
-                }
-            })
-            
-            # Add URL block
-            page_blocks.append({
-                "object": "block",
-                "type": "paragraph",
-                "paragraph": {
-                    "rich_text": [
-                        {
-                            "type": "text",
-                            "text": {
-                                "content": "Original URL: "
-                            },
-                            "annotations": {
-                                "bold": True
-                            }
-                        },
-                        {
-                            "type": "text",
-                            "text": {
-                                "content": page_url or "",
-                                "link": {
-                                    "url": page_url or ""
-                                }
-                            }
-                        }
-                    ]
-                }
-            })
-            
             # Create page with properties and content
-            response = self.client.pages.create(
-                parent={"database_id": self.database_id},
-                properties=properties,
-                children=page_blocks
-            )
+            response = await self._create_page(properties, page_blocks)
+            
+            self._remember_url(page_url)
             
             # Return created page ID
-            return response.id
+            return response["id"]
             
         except Exception as e:
             logger.error(f"Error creating website entry: {e}")
@@ -676,9 +811,14 @@ class NotionHandler:
     
     async def url_exists_in_database(self, url):
         """Check if a URL already exists in the database."""
+        # A URL found before is answered from memory; a miss always asks Notion, so pages
+        # added elsewhere in the meantime are still found
+        if url in self._seen_urls:
+            return True
+        
         try:
             # Query the database for the URL
-            response = self.client.databases.query(
+            response = await self.client.databases.query(
                 database_id=self.database_id,
                 filter={
                     "property": "URL",
@@ -690,111 +830,134 @@ class NotionHandler:
             )
             
             # If there are results, the URL exists
-            return len(response["results"]) > 0
+            if response["results"]:
+                self._seen_urls.add(url)
+                return True
+            return False
         except Exception as e:
             logger.error(f"Error checking if URL exists: {e}")
             return False  # Assume it doesn't exist if there's an error 
     
-    def map_to_preferred_category(self, ai_category):
-        """Map AI-generated categories to preferred categories or keep if it's a good fit."""
-        # Define preferred categories
-        preferred_categories = [
-            "VibeCoding Help",
-            "Cool AI",
-            "Ecommerce", 
-            "Business Ideas",
-            "Cool Tool",
-            "App Idea", 
-            "Ios Development"
-        ]
+    async def urls_exist(self, urls):
+        """Check which of the given URLs already exist in the database.
         
-        # Keywords to match for each category
-        category_keywords = {
-            "VibeCoding Help": ["coding", "programming", "developer", "software", "web development", "html", "css", "javascript", "python", "java"],
-            "Cool AI": ["ai", "artificial intelligence", "machine learning", "deep learning", "nlp", "gpt", "model", "neural", "llm"],
-            "Ecommerce": ["ecommerce", "e-commerce", "shop", "shopping", "marketplace", "retail", "online store", "commerce"],
-            "Business Ideas": ["business", "startup", "entrepreneur", "idea", "venture", "opportunity", "market"],
-            "Cool Tool": ["tool", "utility", "productivity", "automation", "service", "platform"],
-            "App Idea": ["app", "application", "mobile", "concept", "idea"],
-            "Ios Development": ["ios", "swift", "apple", "iphone", "ipad", "xcode", "mobile development", "app development"]
-        }
+        Returns a dict mapping each URL to True/False. URLs found before are answered from memory,
+        the others with one `or` query per 100 URLs instead of one query per URL.
+        """
+        unknown_urls = [url for url in dict.fromkeys(urls) if url not in self._seen_urls]
+        try:
+            # Notion allows at most 100 conditions in a compound filter
+            for i in range(0, len(unknown_urls), 100):
+                batch = unknown_urls[i:i + 100]
+                response = await self.client.databases.query(
+                    database_id=self.database_id,
+                    filter={"or": [{"property": "URL", "url": {"equals": url}} for url in batch]},
+                    page_size=100
+                )
+                self._seen_urls.update(page["properties"]["URL"]["url"] for page in response["results"])
+        except Exception as e:
+            logger.error(f"Error checking if URLs exist: {e}")
+            # Assume the URLs we couldn't check don't exist, like url_exists_in_database does
         
-        # Normalize the AI category to lowercase for matching
-        ai_category_lower = ai_category.lower()
+        return {url: url in self._seen_urls for url in urls}
+    
+    def _remember_url(self, url):
+        """Record a newly saved URL so later existence checks don't need Notion."""
+        if url:
+            self._seen_urls.add(url)
+    
+    @staticmethod
+    def map_to_preferred_category(ai_category):
+        """Map AI-generated categories to preferred categories or keep if it's a good fit."""
+        # Tidy the whitespace once; the matching itself runs on the fully normalized form
+        # (cached, so "AI", " ai " and "Ai" all share one entry)
+        ai_category = " ".join(ai_category.split())
+        length = len(ai_category)
         
-        # Check for exact matches first
-        for category in preferred_categories:
-            if ai_category_lower == category.lower():
-                return category
+        # Nothing to match on an empty or whitespace-only category
+        if not length:
+            return "Cool Tool"
         
-        # Check for keyword matches
-        for category, keywords in category_keywords.items():
-            for keyword in keywords:
-                if keyword in ai_category_lower:
-                    return category
+        category = _match_category(_normalize_category(ai_category))
+        if category is not None:
+            return category
         
         # If it's clearly a new useful category, keep the AI suggestion
         # Otherwise default to "Cool Tool" as a fallback
-        return ai_category if len(ai_category) < 25 else "Cool Tool" 
+        return ai_category if length < 25 else "Cool Tool" 
     
     async def setup_enhanced_properties(self):
         """Add the enhanced properties to the Notion database if they don't exist."""
+        # Skip Notion entirely if a recent run already set this database up
+        state_key = f"{self.database_id}:{','.join(sorted(RECOMMENDED_PROPERTIES))}"
+        state = _load_setup_state()
+        if time.time() - state.get(state_key, 0) < SETUP_STATE_TTL:
+            logger.info("All enhanced properties already exist in the database.")
+            return True, []
+        
         try:
-            # Check if the database exists
-            db = self.client.databases.retrieve(self.database_id)
-            
-            # Define the enhanced properties to add
-            properties_to_add = {
-                "Key Points": {
-                    "rich_text": {}
-                },
-                "Action Items": {
-                    "rich_text": {}
-                },
-                "Personal Reflection": {
-                    "rich_text": {}
-                },
-                "Emoji": {
-                    "rich_text": {}
-                }
+            # Check if the database exists (reusing the cached schema if it's fresh)
+            props = await self._get_schema()
+            
+            # Keep only the enhanced properties the database doesn't have yet
+            properties_to_update = {
+                prop_name: prop_config
+                for prop_name, prop_config in ENHANCED_PROPERTY_SCHEMA.items()
+                if prop_name not in props
             }
             
             # Check if Author property exists and what type it is before deciding to add it
-            if "Author" not in db["properties"]:
-                # See if there are existing people properties to determine best format for Author
-                has_people_property = any(prop["type"] == "people" for prop in db["properties"].values())
-                
-                # If database already uses people properties, use that format for consistency
-                if has_people_property:
-                    properties_to_add["Author"] = {
-                        "people": {}
-                    }
-                else:
-                    # Otherwise use rich_text as default
-                    properties_to_add["Author"] = {
-                        "rich_text": {}
-                    }
-            
-            # Check which properties need to be added
-            properties_to_update = {}
-            for prop_name, prop_config in properties_to_add.items():
-                if prop_name not in db["properties"]:
-                    properties_to_update[prop_name] = prop_config
+            if "Author" not in props:
+                # If database already uses people properties, use that format for consistency,
+                # otherwise use rich_text as default
+                has_people_property = "people" in props.values()
+                properties_to_update["Author"] = _AUTHOR_PEOPLE_SCHEMA if has_people_property else _AUTHOR_TEXT_SCHEMA
             
             # If there are properties to add, update the database
             if properties_to_update:
-                response = self.client.databases.update(
+                response = await self._with_retry(
+                    self.client.databases.update,
                     database_id=self.database_id,
                     properties=properties_to_update
                 )
+                # The update returns the whole database, so refresh the cache from it
+                self._set_schema(response["properties"])
                 
                 added_properties = list(properties_to_update.keys())
-                logger.info(f"Added enhanced properties to database: {', '.join(added_properties)}")
-                return True, added_properties
+                logger.info("Added enhanced properties to database: %s", _LazyJoin(added_properties))
             else:
+                added_properties = []
                 logger.info("All enhanced properties already exist in the database.")
-                return True, []
+            
+            # Remember that this database is set up (re-read in case another setup saved meanwhile)
+            state = _load_setup_state()
+            state[state_key] = time.time()
+            _save_setup_state(state)
+            return True, added_properties
         
+        except APIResponseError as e:
+            # Explain the common Notion errors instead of passing on the raw API message
+            error = _SETUP_ERROR_MESSAGES.get(e.code, str(e))
+            logger.error(f"Notion API error setting up enhanced properties ({e.code}): {e}")
         except Exception as e:
-            logger.error(f"Error setting up enhanced properties: {e}")
-            return False, [str(e)] 
\ No newline at end of file
+            logger.exception("Unexpected error setting up enhanced properties")
+            error = str(e)
+        
+        # Don't trust an old entry for a database we just failed to set up
+        state = _load_setup_state()
+        if state.pop(state_key, None) is not None:
+            _save_setup_state(state)
+        return False, [error]
+    
+    async def setup_enhanced_properties_many(self, database_ids):
+        """Add the enhanced properties to several databases concurrently.
+        
+        Returns a dict of database ID to the (success, added_properties) result for that database.
+        All handlers share this handler's HTTP pool, so the per-key rate limit still applies.
+        """
+        handlers = [
+            self if database_id == self.database_id else NotionHandler(self.api_key, database_id)
+            for database_id in database_ids
+        ]
+        results = await asyncio.gather(*(handler.setup_enhanced_properties() for handler in handlers))
+        return dict(zip(database_ids, results))
@@ -2,53 +2,893 @@ import os
 import json
 import logging
 import re
+import time
 import asyncio
-import requests
+import random
+import hashlib
+import functools
+import base64
+import math
+import operator
+import threading
+from array import array
+import httpx
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 from bs4 import BeautifulSoup
-from openai import OpenAI
+from openai import AsyncOpenAI, APIConnectionError, InternalServerError, RateLimitError
+from env_loader import load_env_file
+
+# Used to cut website text to a token budget; without it the budget is converted to characters
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# OpenAI answers are parsed with orjson when it's installed (its JSONDecodeError is a
+# subclass of json.JSONDecodeError, so the error handling is the same either way)
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# BeautifulSoup parses with lxml (C, several times faster) when it's installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
 
 logger = logging.getLogger(__name__)
 
-# Load environment variables manually
-def load_env_file():
-    """Load environment variables from .env file manually."""
+# Load environment variables (.env is not read when these are all set already, e.g. on Heroku)
+load_env_file("OPENAI_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+
+# Models for the analyses: the fast one answers first, the strong one redoes tweet
+# analyses the fast one wasn't confident about
+OPENAI_MODEL_FAST = os.getenv("OPENAI_MODEL_FAST", "gpt-4o-mini")
+OPENAI_MODEL_STRONG = os.getenv("OPENAI_MODEL_STRONG", "gpt-4o")
+
+# How many OpenAI requests may be in flight at once (keeps bursts under the RPM limit)
+OPENAI_MAX_CONCURRENT = int(os.getenv("OPENAI_MAX_CONCURRENT", "8"))
+
+# OpenAI rate limits for the account (requests and tokens per minute; the defaults are
+# gpt-4o's usage tier 1), enforced before sending so bursts wait instead of getting 429s
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "30000"))
+
+# Most tokens one analysis may answer with (the JSON needs about 300), which also bounds
+# how long a request takes; the temperature keeps the analyses close to deterministic
+OPENAI_COMPLETION_TOKENS = 600
+OPENAI_TEMPERATURE = 0.2
+
+# How often an OpenAI request is tried before giving up, and the backoff bounds (seconds)
+OPENAI_ATTEMPTS = 6
+OPENAI_MIN_RETRY_DELAY = 1
+OPENAI_MAX_RETRY_DELAY = 60
+
+# Errors worth retrying: rate limits, server errors, timeouts and dropped connections
+_OPENAI_RETRY_ERRORS = (RateLimitError, InternalServerError, APIConnectionError)
+
+# Connection limits and timeout (in seconds) for the Nitter/Twitter fallback scrapers
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE = 10
+HTTP_TIMEOUT = 10.0
+
+# Headers sent with every fallback request; over HTTP/2 they're compressed after the first one
+_HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept': 'text/html,application/xhtml+xml,application/xml'
+}
+
+class _RateLimiter:
+    """Request and token buckets, refilled per minute, that each OpenAI request waits on."""
+    
+    def __init__(self, rpm, tpm):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = rpm
+        self._tokens = tpm
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self, tokens):
+        # A request larger than the whole bucket would otherwise wait forever
+        tokens = min(tokens, self.tpm)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                elapsed = now - self._last
+                self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+                self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+                self._last = now
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep(max(
+                    (1 - self._requests) * 60 / self.rpm,
+                    (tokens - self._tokens) * 60 / self.tpm
+                ))
+
+def _estimate_tokens(kwargs):
+    """Roughly estimate the tokens a chat completion uses (about 4 characters per token)."""
+    prompt_chars = sum(len(message["content"]) for message in kwargs.get("messages", ()))
+    prompt_chars += len(json.dumps(kwargs.get("response_format", "")))
+    return prompt_chars // 4 + kwargs.get("max_tokens", OPENAI_COMPLETION_TOKENS)
+
+# OpenAI clients shared by every OpenAIHandler, one per API key, so handlers created per
+# message reuse the connection pool; each comes with the semaphore limiting its requests
+# and the rate limiter for the account
+_openai_clients = {}
+
+def _get_openai_client(api_key):
+    """Get the shared OpenAI client, concurrency semaphore and rate limiter for an API key."""
+    if api_key not in _openai_clients:
+        # Retries are done by _with_retry, with a longer backoff than the client's own. The
+        # HTTP/2 pool lets concurrent requests share one connection (the SDK default is HTTP/1.1).
+        http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=OPENAI_MAX_CONCURRENT, max_keepalive_connections=OPENAI_MAX_CONCURRENT)
+        )
+        _openai_clients[api_key] = (
+            AsyncOpenAI(api_key=api_key, max_retries=0, http_client=http_client),
+            asyncio.Semaphore(OPENAI_MAX_CONCURRENT),
+            _RateLimiter(OPENAI_RPM, OPENAI_TPM)
+        )
+    return _openai_clients[api_key]
+
+async def preconnect_openai_client(api_key=None):
+    """Open the shared client's connection to OpenAI (DNS, TLS) before the first analysis needs it."""
+    client, _, _ = _get_openai_client(api_key or OPENAI_API_KEY)
     try:
-        with open(".env", "r") as file:
-            for line in file:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                key, value = line.split('=', 1)
-                key = key.strip()
-                value = value.strip()
-                
-                # Set it in the environment
-                os.environ[key] = value
+        await client.models.list()
+        logger.info("Connected to the OpenAI API")
+    except Exception as e:
+        logger.warning(f"Could not preconnect to the OpenAI API: {e}")
+
+async def close_openai_clients():
+    """Close the shared OpenAI clients (call once on shutdown)."""
+    while _openai_clients:
+        _, (client, _, _) = _openai_clients.popitem()
+        try:
+            await client.close()
+        except Exception as e:
+            logger.error(f"Error closing OpenAI client: {e}")
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+def _json_key(value):
+    """Serialize a value with sorted keys, as bytes to hash for a cache key."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(value, sort_keys=True).encode()
+
+# How many extraction results to keep, and for how long (in seconds)
+EXTRACT_CACHE_SIZE = 512
+EXTRACT_CACHE_TTL = 3600
+
+# How many OpenAI answers to keep, and for how long (in seconds); the same prompt gets the
+# same analysis, so saving a link again doesn't pay for the tokens again
+COMPLETION_CACHE_SIZE = 256
+COMPLETION_CACHE_TTL = 7 * 24 * 3600
+
+# Query parameters that only track where a link was shared from
+_TRACKING_PARAMS = frozenset({"fbclid", "gclid", "ref", "ref_src", "mc_cid", "mc_eid"})
+
+class _TTLCache:
+    """Small in-process cache whose entries expire after a fixed time (oldest evicted first)."""
+    
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = {}
+    
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if time.monotonic() > expires:
+            del self._entries[key]
+            return None
+        return value
+    
+    def set(self, key, value):
+        self._entries.pop(key, None)
+        while len(self._entries) >= self.maxsize:
+            del self._entries[next(iter(self._entries))]
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+
+# Extracted tweets and websites by normalized URL, so saving the same link again
+# doesn't start the browser again
+_tweet_cache = _TTLCache(EXTRACT_CACHE_SIZE, EXTRACT_CACHE_TTL)
+_website_cache = _TTLCache(EXTRACT_CACHE_SIZE, EXTRACT_CACHE_TTL)
+
+# OpenAI answers (the JSON text) by a hash of the model, messages and response format
+_completion_cache = _TTLCache(COMPLETION_CACHE_SIZE, COMPLETION_CACHE_TTL)
+
+# Website analyses kept on disk across restarts: how many, for how long (in seconds), and
+# how similar (cosine of the prompt embeddings) another page of the same site must be to
+# reuse its analysis
+WEBSITE_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".xtonotion", "website_analyses.json")
+WEBSITE_CACHE_SIZE = 256
+WEBSITE_CACHE_TTL = 7 * 24 * 3600
+WEBSITE_CACHE_SIMILARITY = 0.95
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+class _WebsiteAnalysisCache:
+    """Website analyses saved on disk, found by exact key or by a similar prompt embedding."""
+    
+    def __init__(self, path, maxsize, ttl, similarity):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.similarity = similarity
+        # Loaded on first use: [{"key", "host", "time", "embedding" (unit vector or None), "data"}]
+        self._entries = None
+        # The methods run in worker threads (the similarity scan is CPU work)
+        self._lock = threading.Lock()
+    
+    def _live_entries(self):
+        if self._entries is None:
+            self._entries = []
+            try:
+                with open(self.path, "r") as file:
+                    saved = json.load(file)
+                for entry in saved:
+                    embedding = entry.get("embedding")
+                    if embedding:
+                        entry["embedding"] = array("f", base64.b64decode(embedding))
+                    self._entries.append(entry)
+            except (OSError, ValueError, TypeError, AttributeError):
+                pass
         
-        logger.debug("Successfully loaded environment variables from .env file")
+        # Drop expired entries
+        cutoff = time.time() - self.ttl
+        self._entries = [entry for entry in self._entries if entry["time"] >= cutoff]
+        return self._entries
+    
+    def get(self, key):
+        """The cached analysis for exactly this key, or None."""
+        with self._lock:
+            for entry in self._live_entries():
+                if entry["key"] == key:
+                    return dict(entry["data"])
+        return None
+    
+    def get_similar(self, embedding, host):
+        """The cached analysis from the same host with the most similar embedding, if similar enough, or None."""
+        query = _unit_vector(embedding)
+        best, best_similarity = None, self.similarity
+        with self._lock:
+            for entry in self._live_entries():
+                # Another site's analysis would have its title, author and use cases
+                if entry["embedding"] is None or entry.get("host") != host:
+                    continue
+                similarity = sum(map(operator.mul, query, entry["embedding"]))
+                if similarity >= best_similarity:
+                    best, best_similarity = entry, similarity
+        if best is None:
+            return None
+        logger.info(f"Reusing the analysis of a similar website (similarity {best_similarity:.3f})")
+        return dict(best["data"])
+    
+    def add(self, key, host, embedding, data):
+        """Add an analysis (the embedding may be None) and write the cache to disk."""
+        with self._lock:
+            entries = [entry for entry in self._live_entries() if entry["key"] != key]
+            entries.append({
+                "key": key,
+                "host": host,
+                "time": time.time(),
+                "embedding": array("f", _unit_vector(embedding)) if embedding else None,
+                "data": dict(data)
+            })
+            self._entries = entries[-self.maxsize:]
+            self._save()
+    
+    def _save(self):
+        # Embeddings are stored as base64 float32, about a quarter of the size of JSON numbers
+        saved = [
+            {**entry, "embedding": base64.b64encode(entry["embedding"].tobytes()).decode() if entry["embedding"] is not None else None}
+            for entry in self._entries
+        ]
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w") as file:
+                json.dump(saved, file)
+        except OSError as e:
+            logger.warning(f"Could not save website analysis cache: {e}")
+
+def _unit_vector(vector):
+    """Scale a vector to length 1, so the dot product of two of them is their cosine."""
+    norm = math.sqrt(sum(map(operator.mul, vector, vector))) or 1.0
+    return [value / norm for value in vector]
+
+_website_analyses = _WebsiteAnalysisCache(WEBSITE_CACHE_PATH, WEBSITE_CACHE_SIZE, WEBSITE_CACHE_TTL, WEBSITE_CACHE_SIMILARITY)
+
+def _cache_key(url, keep_query=True):
+    """Normalize a URL for caching: lowercase host, no fragment, no tracking parameters."""
+    parts = urlsplit(url.strip())
+    query = ""
+    if keep_query:
+        query = urlencode([
+            (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not name.startswith("utm_") and name not in _TRACKING_PARAMS
+        ])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ""))
+
+# Elements whose appearance means the page content has rendered
+TWEET_TEXT_SELECTOR = 'article div[data-testid="tweetText"], [data-testid="tweetText"]'
+WEBSITE_CONTENT_SELECTOR = 'main, article, #content, .content'
+
+# Resources the extractors never read, blocked so pages load (and go idle) sooner. Twitter
+# styles its content inline, so its stylesheets can go too; other sites keep theirs, since
+# inner_text depends on what CSS hides.
+_TWEET_BLOCKED_RESOURCES = frozenset({"image", "media", "font", "stylesheet"})
+_WEBSITE_BLOCKED_RESOURCES = frozenset({"image", "media", "font"})
+
+def _resource_blocker(resource_types):
+    """Build a Playwright route handler that aborts requests for the given resource types."""
+    async def handle(route):
+        if route.request.resource_type in resource_types:
+            await route.abort()
+        else:
+            await route.continue_()
+    return handle
+
+def _save_debug_files():
+    """Whether to save screenshots and page HTML (XTONOTION_DEBUG set, or DEBUG logging)."""
+    return bool(os.getenv("XTONOTION_DEBUG")) or logger.isEnabledFor(logging.DEBUG)
+
+# Finds, for each named group, the first selector matching an element with text (or with
+# the given attribute, preferred when set) and returns {name: {selector, text} or null}.
+# Runs in the page, so trying every selector costs one round trip to the browser. Text is
+# cut to the group's maximum length (plus one character, to tell it was cut) before it
+# leaves the page.
+_FIRST_MATCH_JS = """
+(groups) => {
+    const found = {};
+    for (const [name, selectors, attribute, maxLength] of groups) {
+        found[name] = null;
+        for (const selector of selectors) {
+            let element;
+            try {
+                element = document.querySelector(selector);
+            } catch (e) {
+                continue;
+            }
+            if (!element) continue;
+            const text = ((attribute && element.getAttribute(attribute)) || element.innerText || "").trim();
+            if (text) {
+                found[name] = {selector, text: maxLength ? text.slice(0, maxLength + 1) : text};
+                break;
+            }
+        }
+    }
+    return found;
+}
+"""
+
+# Selector groups for _FIRST_MATCH_JS: [name, selectors in order of preference, attribute,
+# optional maximum text length]
+_TWEET_SELECTORS = (
+    ("content", (
+        'article div[data-testid="tweetText"]',
+        'article div[lang]',
+        '[data-testid="tweetText"]',
+        '.tweet-text',
+        'div[data-block="true"]',
+        # Mobile selectors
+        'div[dir="auto"] > span',
+        'div.r-yfoy6g',
+        '[data-testid="tweet"] div[lang]',
+        'div[data-testid="tweet"] span[data-text="true"]',
+        'div[data-testid="tweet"] div[dir="auto"]',
+        'div[data-testid="tweet"] span[class*="css-"]',
+        'div[data-testid="tweet"] span[class*="r-"]'
+    ), None),
+    ("author", (
+        '[data-testid="User-Name"] > div:nth-child(2) > div > div > a > div > span',
+        'a[tabindex="-1"] span',
+        'article div > div > div > div > div > div > div > div > div[dir="auto"] > span',
+        # Mobile selectors
+        'h2[role="heading"]',
+        '[data-testid="User-Name"] span.r-18u37iz',
+        '[data-testid="tweetAuthor"]',
+        'div[data-testid="User-Name"] span[class*="css-"]',
+        'div[data-testid="User-Name"] span[class*="r-"]',
+        'div[data-testid="User-Name"] a[role="link"] span'
+    ), None),
+    ("timestamp", (
+        'time',
+        '[data-testid="User-Name"] time',
+        'article a time',
+        # Mobile selectors
+        'div[data-testid="User-Name"] span.r-18u37iz',
+        'span.r-1qd0xha time',
+        'div[data-testid="User-Name"] time',
+        'div[data-testid="User-Name"] span[class*="css-"] time',
+        'div[data-testid="User-Name"] span[class*="r-"] time'
+    ), "datetime")
+)
+
+# How much of a website's text is sent to OpenAI (to stay within token limits)
+WEBSITE_CONTENT_MAX_CHARS = 8000
+
+_WEBSITE_SELECTORS = (
+    ("description", ('meta[name="description"]',), "content"),
+    ("content", ('main', 'article', '#content', '.content', 'body'), None, WEBSITE_CONTENT_MAX_CHARS)
+)
+
+# Twitter's login dialog, and the buttons that close it
+_LOGIN_DIALOG_SELECTORS = (
+    'div[role="dialog"]',
+    'div[data-testid="loginDialog"]',
+    'div[data-testid="modal"]',
+    'div[aria-modal="true"]'
+)
+_CLOSE_BUTTON_SELECTORS = (
+    'div[role="button"][aria-label="Close"]',
+    'div[aria-label="Close"]',
+    'div[data-testid="app-bar-close"]',
+    'div[role="button"] svg[aria-label="Close"]'
+)
+
+# Tweet ID and username in a tweet URL
+_STATUS_RE = re.compile(r'/status/(\d+)')
+_USERNAME_RE = re.compile(r'(?:twitter|x)\.com/([^/]+)/')
+
+def _parse_nitter_page(html, tweet_url):
+    """Parse a Nitter status page into tweet data, or None if it has no tweet content."""
+    soup = BeautifulSoup(html, HTML_PARSER)
+    
+    # For Nitter, this is the selector for tweet content
+    tweet_content_element = soup.select_one('.tweet-content')
+    if not tweet_content_element:
+        return None
+    tweet_content = tweet_content_element.get_text().strip()
+    
+    # Get author information
+    author_element = soup.select_one('.fullname')
+    author = author_element.get_text().strip() if author_element else "Unknown"
+    
+    # Get timestamp
+    time_element = soup.select_one('.tweet-date a')
+    timestamp = time_element.get_text().strip() if time_element else ""
+    
+    # Get tweet images if any
+    images = []
+    image_elements = soup.select('.attachment .still-image')
+    for img in image_elements:
+        if img.get('src'):
+            images.append(img['src'])
+    
+    # Get tweet stats
+    stats = {}
+    stat_elements = soup.select('.tweet-stats .icon-container')
+    for stat in stat_elements:
+        text = stat.get_text().strip()
+        if "reply" in text.lower():
+            stats["replies"] = text.split()[0]
+        elif "retweet" in text.lower():
+            stats["retweets"] = text.split()[0]
+        elif "like" in text.lower():
+            stats["likes"] = text.split()[0]
+    
+    return {
+        "content": tweet_content,
+        "author": author,
+        "timestamp": timestamp,
+        "images": images,
+        "stats": stats,
+        "url": tweet_url
+    }
+
+# Selectors that might find the tweet text in a Twitter/X page fetched without a browser
+_TWITTER_HTML_SELECTORS = ('article div[lang]', '[data-testid="tweetText"]', '.tweet-text')
+
+def _parse_twitter_page(html, tweet_url):
+    """Parse a Twitter/X status page fetched over plain HTTP, or None if it has no tweet text."""
+    soup = BeautifulSoup(html, HTML_PARSER)
+    
+    # Try various selectors that might work for Twitter
+    for selector in _TWITTER_HTML_SELECTORS:
+        content_element = soup.select_one(selector)
+        if content_element:
+            return {
+                "content": content_element.get_text().strip(),
+                "author": "Unknown",
+                "timestamp": "",
+                "images": [],
+                "stats": {},
+                "url": tweet_url
+            }
+    return None
+
+# Categories the analyses choose from (the JSON schemas below only allow these)
+ANALYSIS_CATEGORIES = [
+    "VibeCoding Help",
+    "Cool AI",
+    "Ecommerce",
+    "Business Ideas",
+    "Cool Tool",
+    "App Idea",
+    "Ios Development"
+]
+
+_CATEGORY_PROPERTY = {
+    "type": "string",
+    "enum": ANALYSIS_CATEGORIES,
+    "description": "VibeCoding Help: programming; Cool AI: AI/ML/LLMs; Ecommerce: online stores; "
+                   "Business Ideas: startups; Cool Tool: productivity tools and services; "
+                   "App Idea: app concepts; Ios Development: iOS specific"
+}
+
+def _strict_object(properties):
+    """JSON schema for an object that must have exactly these properties."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+def _json_schema_format(name, schema):
+    """response_format asking OpenAI for JSON that follows the given schema."""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+# The fields of one tweet analysis; the descriptions are the instructions for each field
+_TWEET_ANALYSIS_PROPERTIES = {
+    "title": {"type": "string", "description": "Catchy title"},
+    "category": _CATEGORY_PROPERTY,
+    "summary": {"type": "string", "description": "Concise summary"},
+    "key_points": {"type": "array", "items": {"type": "string"}, "description": "3-5 main ideas"},
+    "action_items": {"type": "array", "items": {"type": "string"}, "description": "2-3 follow-up actions"},
+    "personal_reflection": {"type": "string", "description": "How to apply it to business or personal life, 1-2 sentences"},
+    "importance": {"type": "integer", "description": "Significance from 1 to 10"},
+    "emoji": {"type": "string", "description": "One emoji for the content or purpose"},
+    "confident": {"type": "boolean", "description": "False if working with limited information"}
+}
+
+_TWEET_RESPONSE_FORMAT = _json_schema_format("tweet_analysis", _strict_object(_TWEET_ANALYSIS_PROPERTIES))
+
+_TWEET_BATCH_RESPONSE_FORMAT = _json_schema_format("tweet_analyses", _strict_object({
+    "results": {
+        "type": "array",
+        "items": _strict_object({
+            "index": {"type": "integer", "description": "Number of the tweet, as given in square brackets"},
+            **_TWEET_ANALYSIS_PROPERTIES
+        })
+    }
+}))
+
+# Kinds of website the analysis tells apart
+WEBSITE_TYPES = ["Tool", "Resource", "App", "Service", "Other"]
+
+# Website analyses from the fast model below this confidence are redone by the strong one
+WEBSITE_MIN_CONFIDENCE = 0.5
+
+_WEBSITE_ANALYSIS_PROPERTIES = {
+    "title": {"type": "string", "description": "Clear, concise title of the website or tool"},
+    "category": _CATEGORY_PROPERTY,
+    "type": {"type": "string", "enum": WEBSITE_TYPES},
+    "description": {"type": "string", "description": "What it does and what problems it solves"},
+    "use_cases": {"type": "array", "items": {"type": "string"}, "maxItems": 3, "description": "2-3 primary use cases"},
+    "alternatives": {"type": "array", "items": {"type": "string"}, "maxItems": 2, "description": "1-2 similar tools, if known"},
+    "author": {"type": "string", "description": "Creator, company or person, otherwise \"Unknown\""},
+    "emoji": {"type": "string", "description": "One emoji for its purpose or category"},
+    "confidence": {"type": "number", "description": "How sure you are of this analysis, from 0 to 1"}
+}
+
+_WEBSITE_RESPONSE_FORMAT = _json_schema_format("website_analysis", _strict_object(_WEBSITE_ANALYSIS_PROPERTIES))
+
+_WEBSITE_BATCH_RESPONSE_FORMAT = _json_schema_format("website_analyses", _strict_object({
+    "results": {
+        "type": "array",
+        "items": _strict_object({
+            "index": {"type": "integer", "description": "Number of the website, as in ---SITE n---"},
+            **_WEBSITE_ANALYSIS_PROPERTIES
+        })
+    }
+}))
+
+# Prompts for the website analyses. The system prompts are fixed strings, so every request
+# starts with the same prefix (which OpenAI can serve from its prompt cache); the user
+# templates put their fixed instructions before the per-request text.
+_WEBSITE_SYSTEM_PROMPT = "You analyze websites and tools."
+_WEBSITE_USER_TEMPLATE = "Analyze this website:\n\n{prompt}"
+_WEBSITE_BATCH_USER_TEMPLATE = "Analyze each of the following websites on its own, one result per website in the same order:\n\n{sites}"
+
+# Budget for analyze_websites_multi: websites are grouped into requests whose prompts plus
+# expected answers stay under this many characters (roughly 4 per token)
+WEBSITE_BATCH_MAX_CHARS = 48000
+WEBSITE_RESULT_CHARS = 2000
+
+# How many tokens of a website's text go into its prompt
+WEBSITE_PROMPT_TOKENS = 1000
+
+_WORD_RE = re.compile(r'\S+')
+
+# How many words _clean_chunks puts in each chunk
+CLEAN_CHUNK_WORDS = 200
+
+@functools.lru_cache(maxsize=1)
+def _token_encoding():
+    """The analysis model's tokenizer, or None if tiktoken isn't installed or can't load it."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model("gpt-4o")
     except Exception as e:
-        logger.error(f"Error loading .env file: {e}")
+        logger.warning(f"Could not load the tokenizer, cutting website text by characters: {e}")
+        return None
 
-# Load environment variables
-load_env_file()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+def _clean_chunks(text):
+    """Yield the text a few hundred words at a time, with runs of whitespace collapsed."""
+    # Scraped text is full of layout whitespace, which costs tokens and says nothing
+    words = []
+    separator = ""
+    for match in _WORD_RE.finditer(text):
+        words.append(match.group())
+        if len(words) == CLEAN_CHUNK_WORDS:
+            yield separator + " ".join(words)
+            words = []
+            separator = " "
+    if words:
+        yield separator + " ".join(words)
+
+def _read_limited(chunks, max_tokens):
+    """Join text chunks until max_tokens tokens (about 4 characters each without a tokenizer), then stop reading."""
+    encoding = _token_encoding()
+    parts = []
+    used = 0
+    for chunk in chunks:
+        tokens = encoding.encode(chunk, disallowed_special=()) if encoding is not None else None
+        count = len(tokens) if tokens is not None else -(-len(chunk) // 4)
+        if used + count > max_tokens:
+            remaining = max_tokens - used
+            parts.append(encoding.decode(tokens[:remaining]) if tokens is not None else chunk[:remaining * 4])
+            break
+        parts.append(chunk)
+        used += count
+    return "".join(parts)
+
+def _website_prompt(website_url, website_data):
+    """Format extracted website data as the prompt text describing one website."""
+    # Only as much of the text as fits the budget is cleaned and tokenized
+    content = _read_limited(_clean_chunks(website_data['content']), WEBSITE_PROMPT_TOKENS)
+    return f"""Website URL: {website_url}
+Title: {website_data['title']}
+Description: {website_data['description']}
+
+Content Preview:
+{content}
+"""
+
+def _website_request(website_prompt, model=OPENAI_MODEL_FAST):
+    """Chat completion parameters for analyzing one website."""
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": _WEBSITE_SYSTEM_PROMPT},
+            {"role": "user", "content": _WEBSITE_USER_TEMPLATE.format(prompt=website_prompt)}
+        ],
+        "response_format": _WEBSITE_RESPONSE_FORMAT,
+        "max_tokens": OPENAI_COMPLETION_TOKENS,
+        "temperature": OPENAI_TEMPERATURE
+    }
+
+# Links to other pages of the same site found in an analyzed page's text are analyzed in the
+# background while the bot is idle, so sending one of them later hits the caches. Up to
+# WEBSITE_PREFETCH_LINKS per page (0, the default, turns this off, since every prefetched
+# page costs an OpenAI request), with at most WEBSITE_PREFETCH_QUEUE_SIZE waiting
+WEBSITE_PREFETCH_LINKS = int(os.getenv("WEBSITE_PREFETCH_LINKS", "0"))
+WEBSITE_PREFETCH_QUEUE_SIZE = 32
+_LINK_RE = re.compile(r'https?://[^\s<>"\'()\[\]]+')
+
+# How often (in seconds) to check on a Batch API job, and the states it can end in
+BATCH_POLL_INTERVAL = 60
+_BATCH_FINAL_STATES = frozenset({"completed", "failed", "expired", "cancelled"})
+
+def _website_extracted(website_data):
+    """Whether the page's content was extracted (neither empty nor an extraction error)."""
+    content = website_data.get("content") or ""
+    return bool(content.strip()) and not content.startswith("Error extracting content")
+
+def _website_analysis_ok(data):
+    """Whether a website analysis has a known category and type and is confident enough."""
+    confidence = data.get("confidence")
+    return (
+        data.get("category") in ANALYSIS_CATEGORIES
+        and data.get("type") in WEBSITE_TYPES
+        and isinstance(confidence, (int, float))
+        and confidence >= WEBSITE_MIN_CONFIDENCE
+    )
+
+def _match_batch_results(results, count):
+    """Order batch results by their 1-based "index" field; positions without a result get None."""
+    matched = [None] * count
+    for position, data in enumerate(results):
+        if not isinstance(data, dict):
+            continue
+        index = data.pop("index", position + 1)
+        if not isinstance(index, int) or not 1 <= index <= count or matched[index - 1] is not None:
+            logger.warning(f"Ignoring batch result with unexpected index {index!r}")
+            continue
+        matched[index - 1] = data
+    
+    missing = matched.count(None)
+    if missing:
+        logger.warning(f"OpenAI returned no analysis for {missing} of {count} items")
+    return matched
+
+# Prompts for the tweet analyses (the schemas describe the fields), kept as fixed prefixes
+# like the website prompts
+_TWEET_SYSTEM_PROMPT = """You analyze Twitter/X posts. If the tweet content is missing, make educated guesses \
+from the username, tweet ID and URL (a tech person or company likely posts technology-related content)."""
+_TWEET_BATCH_SYSTEM_PROMPT = _TWEET_SYSTEM_PROMPT + "\nAnalyze each numbered tweet on its own, one result per tweet in the same order."
+_TWEET_USER_TEMPLATE = "Analyze this tweet:\n\n{prompt}"
+_TWEET_BATCH_USER_TEMPLATE = "Analyze these tweets:\n\n{prompts}"
+
+# What extract_tweet_content returns when nothing could be read from the tweet
+_TWEET_NOT_EXTRACTED = "Could not extract tweet content. Twitter may have blocked the request."
+
+# Limits for analyze_tweets_batch: at most this many tweets per request, and a budget of
+# roughly 4 characters per token for the prompts plus the expected size of each answer
+TWEET_BATCH_MAX_SIZE = 10
+TWEET_BATCH_MAX_CHARS = 48000
+TWEET_RESULT_CHARS = 2000
+
+def _tweet_prompt(tweet_url, tweet_data):
+    """Format extracted tweet data as the prompt text describing one tweet."""
+    # If extraction failed completely, try to get data from tweet ID
+    if tweet_data.get("content") == _TWEET_NOT_EXTRACTED:
+        logger.warning("Using fallback method to get tweet info from tweet ID")
+        
+        # Extract the tweet ID from the URL
+        tweet_id_match = _STATUS_RE.search(tweet_url)
+        if tweet_id_match:
+            tweet_id = tweet_id_match.group(1)
+            
+            # Extract the username from the URL
+            username_match = _USERNAME_RE.search(tweet_url)
+            username = username_match.group(1) if username_match else "Unknown"
+            
+            # Add this basic info to help the AI make better guesses
+            tweet_data["username"] = username
+            tweet_data["tweet_id"] = tweet_id
+    
+    # Format the tweet information for OpenAI
+    tweet_prompt = f"""Tweet URL: {tweet_url}
+Author: {tweet_data.get('author', 'Unknown')}
+Timestamp: {tweet_data.get('timestamp', '')}
+Content: {tweet_data.get('content', 'Not available')}
+Images: {"Yes, " + str(len(tweet_data.get('images', []))) + " images" if tweet_data.get('images', []) else "No images"}
+Stats: {json.dumps(tweet_data.get('stats', {})) if tweet_data.get('stats', {}) else "Not available"}
+"""
+
+    # Add any extra context if we couldn't extract the content
+    if tweet_data.get("content") == _TWEET_NOT_EXTRACTED:
+        tweet_prompt += f"""
+Note: The tweet content could not be directly extracted.
+Username: {tweet_data.get('username', 'Unknown')}
+Tweet ID: {tweet_data.get('tweet_id', 'Unknown')}
 
-# Flag to track if playwright has been initialized
-playwright_initialized = False
+Please make your best guess about the content based on the URL, username, and any other available information.
+"""
+    return tweet_prompt
 
 class OpenAIHandler:
     def __init__(self, api_key=None):
         """Initialize the OpenAI handler with an API key."""
         self.api_key = api_key or OPENAI_API_KEY
-        self.client = OpenAI(api_key=self.api_key)
+        self.client, self._llm_sem, self._llm_limiter = _get_openai_client(self.api_key)
+        # HTTP client for the Nitter/Twitter fallbacks, created on first use
+        self._httpx = None
         self.playwright = None
         self.browser = None
+        # Browser contexts for tweets (mobile emulation) and websites, created once with the
+        # browser and reused; each extraction only opens and closes a page
+        self._tweet_context = None
+        self._website_context = None
+        # Concurrent extractions share one browser, so only one of them may start it
+        self._playwright_lock = asyncio.Lock()
+        # Website prefetching: the queued links, every link queued so far, the worker (started
+        # with the first queued link) and whether no foreground analysis is running
+        self._prefetch_queue = asyncio.Queue(maxsize=WEBSITE_PREFETCH_QUEUE_SIZE)
+        self._prefetch_seen = set()
+        self._prefetch_task = None
+        self._analyses_running = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+    
+    def _get_http_client(self):
+        """Return the HTTP/2 client for the fallback scrapers, creating it if needed."""
+        # One client for all probes, so they share connections (and multiplex over HTTP/2)
+        if self._httpx is None or self._httpx.is_closed:
+            self._httpx = httpx.AsyncClient(
+                http2=True,
+                timeout=HTTP_TIMEOUT,
+                headers=_HTTP_HEADERS,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE)
+            )
+        return self._httpx
+    
+    async def _chat_json(self, **kwargs):
+        """Get a JSON chat completion as a dict, reusing the answer to an identical request."""
+        key = hashlib.sha256(_json_key(kwargs)).hexdigest()
+        content = _completion_cache.get(key)
+        if content is not None:
+            logger.info("Using cached OpenAI analysis for an identical prompt")
+            return _json_loads(content)
+        
+        response = await self._chat_completion(**kwargs)
+        choice = response.choices[0]
+        # With a strict json_schema the answer always parses, unless the model refused or was cut off
+        if getattr(choice.message, "refusal", None):
+            raise ValueError(f"OpenAI refused the request: {choice.message.refusal}")
+        if choice.finish_reason == "length":
+            raise ValueError("OpenAI answer was cut off before the JSON was complete")
+        content = choice.message.content
+        # Parse before caching, so an invalid answer is never reused
+        data = _json_loads(content)
+        _completion_cache.set(key, content)
+        return data
+    
+    async def _embed(self, text):
+        """Embed text for the website cache, or None if the embedding request fails."""
+        try:
+            response = await self._with_retry(
+                self.client.embeddings.create,
+                len(text) // 4,
+                model=EMBEDDING_MODEL,
+                input=text
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            logger.warning(f"Could not embed website prompt, skipping the similarity lookup: {e}")
+            return None
+    
+    async def _chat_completion(self, **kwargs):
+        """Create a chat completion, limiting concurrency and backing off on rate limits."""
+        return await self._with_retry(self.client.chat.completions.create, _estimate_tokens(kwargs), **kwargs)
+    
+    async def _with_retry(self, endpoint, tokens, **kwargs):
+        """Call an OpenAI endpoint within the rate limits, retrying on rate limits, server errors and timeouts."""
+        for attempt in range(OPENAI_ATTEMPTS):
+            try:
+                await self._llm_limiter.acquire(tokens)
+                async with self._llm_sem:
+                    return await endpoint(**kwargs)
+            except _OPENAI_RETRY_ERRORS as e:
+                if attempt == OPENAI_ATTEMPTS - 1:
+                    raise
+                
+                # Honor OpenAI's Retry-After, otherwise wait a random time up to an exponentially
+                # growing limit, so requests that failed together don't retry together
+                response = getattr(e, "response", None)
+                retry_after = response.headers.get("retry-after") if response is not None else None
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    delay = max(OPENAI_MIN_RETRY_DELAY, random.uniform(0, 2 ** (attempt + 1)))
+                delay = min(delay, OPENAI_MAX_RETRY_DELAY)
+                
+                logger.warning(f"OpenAI request failed ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
     
     async def init_playwright(self):
         """Initialize Playwright for browser automation."""
-        global playwright_initialized
-        if not playwright_initialized:
+        async with self._playwright_lock:
+            return await self._init_playwright()
+    
+    async def _init_playwright(self):
+        """Start Playwright, the browser and its contexts if that hasn't happened yet."""
+        if self.browser is None:
             try:
                 # Import here to avoid early initialization
                 from playwright.async_api import async_playwright
@@ -73,16 +913,65 @@ class OpenAIHandler:
                         '--window-size=1920,1080',
                     ]
                 )
-                playwright_initialized = True
+                self._tweet_context = await self._new_tweet_context()
+                self._website_context = await self.browser.new_context(
+                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+                )
+                await self._tweet_context.route("**/*", _resource_blocker(_TWEET_BLOCKED_RESOURCES))
+                await self._website_context.route("**/*", _resource_blocker(_WEBSITE_BLOCKED_RESOURCES))
                 logger.info("Playwright initialized successfully")
             except ImportError:
                 logger.error("Playwright not installed. Run 'pip install playwright' and 'playwright install'")
                 return False
             except Exception as e:
                 logger.error(f"Error initializing Playwright: {e}")
+                # Tear down whatever did start, so the next call tries again from scratch
+                await self.close()
                 return False
         return True
     
+    async def _new_tweet_context(self):
+        """Create the browser context used for tweets."""
+        # Use a more realistic browser configuration with mobile emulation
+        # Mobile often has less restrictions than desktop views
+        context = await self.browser.new_context(
+            user_agent="Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1",
+            viewport={"width": 390, "height": 844},
+            device_scale_factor=2.0,
+            has_touch=True,
+            locale="en-US",
+            timezone_id="America/New_York",
+            is_mobile=True,
+            java_script_enabled=True,
+            bypass_csp=True,
+            ignore_https_errors=True
+        )
+        
+        # Add random cookies and headers to appear more like a real browser
+        await context.add_cookies([
+            {"name": "seen_ui_prompt", "value": "true", "domain": ".twitter.com", "path": "/"},
+            {"name": "seen_ui_prompt", "value": "true", "domain": ".x.com", "path": "/"},
+            {"name": "auth_token", "value": "", "domain": ".twitter.com", "path": "/"},
+            {"name": "ct0", "value": "", "domain": ".twitter.com", "path": "/"},
+            {"name": "twid", "value": "", "domain": ".twitter.com", "path": "/"}
+        ])
+        
+        # Set extra headers to appear more like a real browser
+        await context.set_extra_http_headers({
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.5",
+            "Accept-Encoding": "gzip, deflate, br",
+            "DNT": "1",
+            "Connection": "keep-alive",
+            "Upgrade-Insecure-Requests": "1",
+            "Sec-Fetch-Dest": "document",
+            "Sec-Fetch-Mode": "navigate",
+            "Sec-Fetch-Site": "none",
+            "Sec-Fetch-User": "?1",
+            "Cache-Control": "max-age=0"
+        })
+        return context
+    
     async def extract_with_playwright(self, url):
         """Extract tweet content using Playwright browser automation."""
         logger.info("Running new version of extract_with_playwright with improved browser configuration")
@@ -90,235 +979,136 @@ class OpenAIHandler:
             return None
         
         try:
-            # Use a more realistic browser configuration with mobile emulation
-            # Mobile often has less restrictions than desktop views
-            context = await self.browser.new_context(
-                user_agent="Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.0 Mobile/15E148 Safari/604.1",
-                viewport={"width": 390, "height": 844},
-                device_scale_factor=2.0,
-                has_touch=True,
-                locale="en-US",
-                timezone_id="America/New_York",
-                is_mobile=True,
-                java_script_enabled=True,
-                bypass_csp=True,
-                ignore_https_errors=True
-            )
-            
-            # Add random cookies and headers to appear more like a real browser
-            await context.add_cookies([
-                {"name": "seen_ui_prompt", "value": "true", "domain": ".twitter.com", "path": "/"},
-                {"name": "seen_ui_prompt", "value": "true", "domain": ".x.com", "path": "/"},
-                {"name": "auth_token", "value": "", "domain": ".twitter.com", "path": "/"},
-                {"name": "ct0", "value": "", "domain": ".twitter.com", "path": "/"},
-                {"name": "twid", "value": "", "domain": ".twitter.com", "path": "/"}
-            ])
-            
-            # Set extra headers to appear more like a real browser
-            await context.set_extra_http_headers({
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.5",
-                "Accept-Encoding": "gzip, deflate, br",
-                "DNT": "1",
-                "Connection": "keep-alive",
-                "Upgrade-Insecure-Requests": "1",
-                "Sec-Fetch-Dest": "document",
-                "Sec-Fetch-Mode": "navigate",
-                "Sec-Fetch-Site": "none",
-                "Sec-Fetch-User": "?1",
-                "Cache-Control": "max-age=0"
-            })
-            
-            page = await context.new_page()
-            
-            # Set longer timeout for Twitter's slow loading
-            page.set_default_timeout(60000)  # Increase timeout to 60 seconds
-            
-            logger.info(f"Navigating to Twitter URL: {url}")
-            
-            # Try multiple navigation strategies
-            navigation_success = False
-            for _ in range(3):  # Try up to 3 times
-                try:
-                    response = await page.goto(url, wait_until="networkidle", timeout=60000)
-                    if response and response.ok:
-                        navigation_success = True
-                        break
-                    await asyncio.sleep(2)
-                except Exception as e:
-                    logger.warning(f"Navigation attempt failed: {e}")
-                    await asyncio.sleep(2)
-            
-            if not navigation_success:
-                logger.warning("Failed to navigate to the page after multiple attempts")
-                return None
-            
-            # Wait longer for dynamic content
-            await asyncio.sleep(5)  # Increased from 4 to 5 seconds
-            
-            # Try to handle the login modal more aggressively
-            try:
-                # First try to handle the login dialog if present
-                login_dialog_selectors = [
-                    'div[role="dialog"]',
-                    'div[data-testid="loginDialog"]',
-                    'div[data-testid="modal"]',
-                    'div[aria-modal="true"]'
-                ]
+            # The page is closed however this ends (the context stays open for the next tweet)
+            async with await self._tweet_context.new_page() as page:
+                # Set longer timeout for Twitter's slow loading
+                page.set_default_timeout(60000)  # Increase timeout to 60 seconds
                 
-                for selector in login_dialog_selectors:
-                    if await page.locator(selector).count() > 0:
-                        logger.info(f"Login dialog detected with selector: {selector}, attempting to dismiss")
-                        
-                        # Try multiple approaches to dismiss the dialog
-                        try:
-                            # Try to find and click the "✕" close button
-                            close_button_selectors = [
-                                'div[role="button"][aria-label="Close"]',
-                                'div[aria-label="Close"]',
-                                'div[data-testid="app-bar-close"]',
-                                'div[role="button"] svg[aria-label="Close"]'
-                            ]
-                            
-                            for close_selector in close_button_selectors:
-                                close_button = page.locator(close_selector)
-                                if await close_button.count() > 0:
-                                    await close_button.click()
-                                    await asyncio.sleep(1)
-                                    break
-                            
-                            # If close button didn't work, try clicking outside
-                            await page.mouse.click(10, 10)
-                            await asyncio.sleep(1)
-                            
-                            # Try clicking at the tweet content area
-                            await page.mouse.click(195, 400)
-                            await asyncio.sleep(1)
-                            
-                            # Try pressing Escape key
-                            await page.keyboard.press('Escape')
-                            await asyncio.sleep(1)
-                        except Exception as e:
-                            logger.warning(f"Error dismissing dialog: {e}")
+                logger.info(f"Navigating to Twitter URL: {url}")
                 
-                # Scroll down to load more content
-                await page.evaluate("window.scrollBy(0, 300)")
-                await asyncio.sleep(1)
-            except Exception as e:
-                logger.warning(f"Error handling login dialog: {e}")
-            
-            # Try different selectors that might match tweet content
-            tweet_content = None
-            author = None
-            timestamp = None
-            
-            # Try different selectors for the tweet content
-            for content_selector in [
-                'article div[data-testid="tweetText"]',
-                'article div[lang]',
-                '[data-testid="tweetText"]',
-                '.tweet-text',
-                'div[data-block="true"]',
-                # Mobile selectors
-                'div[dir="auto"] > span',
-                'div.r-yfoy6g',
-                '[data-testid="tweet"] div[lang]',
-                'div[data-testid="tweet"] span[data-text="true"]',
-                'div[data-testid="tweet"] div[dir="auto"]',
-                'div[data-testid="tweet"] span[class*="css-"]',
-                'div[data-testid="tweet"] span[class*="r-"]'
-            ]:
+                # Try multiple navigation strategies
+                navigation_success = False
+                for _ in range(3):  # Try up to 3 times
+                    try:
+                        response = await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+                        if response and response.ok:
+                            navigation_success = True
+                            break
+                        await asyncio.sleep(2)
+                    except Exception as e:
+                        logger.warning(f"Navigation attempt failed: {e}")
+                        await asyncio.sleep(2)
+                
+                if not navigation_success:
+                    logger.warning("Failed to navigate to the page after multiple attempts")
+                    return None
+                
+                # Wait for the tweet text to render instead of sleeping a fixed time
                 try:
-                    element = page.locator(content_selector)
-                    if await element.count() > 0:
-                        tweet_content = await element.inner_text()
-                        logger.info(f"Found tweet content with selector: {content_selector}")
-                        break
+                    await page.wait_for_selector(TWEET_TEXT_SELECTOR, state="attached", timeout=15000)
                 except Exception as e:
-                    logger.debug(f"Selector {content_selector} failed: {e}")
-                    continue
-            
-            # Try to get author info
-            for author_selector in [
-                '[data-testid="User-Name"] > div:nth-child(2) > div > div > a > div > span',
-                'a[tabindex="-1"] span',
-                'article div > div > div > div > div > div > div > div > div[dir="auto"] > span',
-                # Mobile selectors
-                'h2[role="heading"]',
-                '[data-testid="User-Name"] span.r-18u37iz',
-                '[data-testid="tweetAuthor"]',
-                'div[data-testid="User-Name"] span[class*="css-"]',
-                'div[data-testid="User-Name"] span[class*="r-"]',
-                'div[data-testid="User-Name"] a[role="link"] span'
-            ]:
-                try:
-                    element = page.locator(author_selector)
-                    if await element.count() > 0:
-                        author = await element.first.inner_text()
-                        logger.info(f"Found author: {author}")
-                        break
-                except Exception:
-                    continue
-            
-            # Try to get timestamp
-            for time_selector in [
-                'time',
-                '[data-testid="User-Name"] time',
-                'article a time',
-                # Mobile selectors
-                'div[data-testid="User-Name"] span.r-18u37iz',
-                'span.r-1qd0xha time',
-                'div[data-testid="User-Name"] time',
-                'div[data-testid="User-Name"] span[class*="css-"] time',
-                'div[data-testid="User-Name"] span[class*="r-"] time'
-            ]:
+                    logger.warning(f"Tweet text didn't appear, trying the other selectors anyway: {e}")
+                
+                # Try to handle the login modal more aggressively
                 try:
-                    element = page.locator(time_selector)
-                    if await element.count() > 0:
-                        timestamp_element = page.locator(time_selector).first
-                        timestamp = await timestamp_element.get_attribute('datetime')
-                        if not timestamp:
-                            timestamp = await timestamp_element.inner_text()
-                        logger.info(f"Found timestamp: {timestamp}")
-                        break
-                except Exception:
-                    continue
-            
-            # Take a screenshot for debugging
-            try:
-                await page.screenshot(path="tweet_screenshot.png")
-                logger.info("Saved screenshot to tweet_screenshot.png")
-            except Exception as e:
-                logger.error(f"Error saving screenshot: {e}")
-            
-            # Get HTML content for debugging
-            html_content = await page.content()
-            with open("tweet_page.html", "w", encoding="utf-8") as f:
-                f.write(html_content)
-            logger.info("Saved page HTML to tweet_page.html")
-            
-            await context.close()
-            
-            if tweet_content:
-                result = {
-                    "content": tweet_content,
-                    "author": author or "Unknown",
-                    "timestamp": timestamp or "",
-                    "images": [],
-                    "stats": {},
-                    "url": url
-                }
-                logger.info(f"Successfully extracted tweet content with Playwright: {tweet_content[:100]}...")
-                return result
-            
-            logger.warning("Playwright couldn't extract tweet content")
-            return None
-            
+                    # First try to handle the login dialog if present
+                    for selector in _LOGIN_DIALOG_SELECTORS:
+                        if await page.locator(selector).count() > 0:
+                            logger.info(f"Login dialog detected with selector: {selector}, attempting to dismiss")
+                            
+                            # Try multiple approaches to dismiss the dialog
+                            try:
+                                # Try to find and click the "✕" close button
+                                for close_selector in _CLOSE_BUTTON_SELECTORS:
+                                    close_button = page.locator(close_selector).first
+                                    if await close_button.count() > 0:
+                                        await close_button.click()
+                                        await asyncio.sleep(1)
+                                        break
+                                
+                                # If close button didn't work, try clicking outside
+                                await page.mouse.click(10, 10)
+                                await asyncio.sleep(1)
+                                
+                                # Try clicking at the tweet content area
+                                await page.mouse.click(195, 400)
+                                await asyncio.sleep(1)
+                                
+                                # Try pressing Escape key
+                                await page.keyboard.press('Escape')
+                                await asyncio.sleep(1)
+                            except Exception as e:
+                                logger.warning(f"Error dismissing dialog: {e}")
+                except Exception as e:
+                    logger.warning(f"Error handling login dialog: {e}")
+                
+                # Try different selectors that might match tweet content
+                tweet_content = None
+                author = None
+                timestamp = None
+                
+                # Try all the content, author and timestamp selectors in one in-page call
+                found = await page.evaluate(_FIRST_MATCH_JS, _TWEET_SELECTORS)
+                if found["content"]:
+                    tweet_content = found["content"]["text"]
+                    logger.info(f"Found tweet content with selector: {found['content']['selector']}")
+                if found["author"]:
+                    author = found["author"]["text"]
+                    logger.info(f"Found author: {author}")
+                if found["timestamp"]:
+                    timestamp = found["timestamp"]["text"]
+                    logger.info(f"Found timestamp: {timestamp}")
+                
+                # Take a screenshot and save the HTML, only when debugging
+                if _save_debug_files():
+                    try:
+                        await page.screenshot(path="tweet_screenshot.png")
+                        logger.info("Saved screenshot to tweet_screenshot.png")
+                    except Exception as e:
+                        logger.error(f"Error saving screenshot: {e}")
+                    
+                    html_content = await page.content()
+                    with open("tweet_page.html", "w", encoding="utf-8") as f:
+                        f.write(html_content)
+                    logger.info("Saved page HTML to tweet_page.html")
+                
+                if tweet_content:
+                    result = {
+                        "content": tweet_content,
+                        "author": author or "Unknown",
+                        "timestamp": timestamp or "",
+                        "images": [],
+                        "stats": {},
+                        "url": url
+                    }
+                    logger.info(f"Successfully extracted tweet content with Playwright: {tweet_content[:100]}...")
+                    return result
+                
+                logger.warning("Playwright couldn't extract tweet content")
+                return None
+                
         except Exception as e:
             logger.error(f"Error using Playwright to extract tweet: {e}")
             return None
     
     async def extract_tweet_content(self, tweet_url):
+        """Extract tweet content from Twitter/X URL, reusing a recent result for the same tweet."""
+        # Status URLs don't need their query string (?s=20&t=... only says how it was shared)
+        key = _cache_key(tweet_url, keep_query=False)
+        cached = _tweet_cache.get(key)
+        if cached is not None:
+            logger.info(f"Using cached tweet content for {tweet_url}")
+            return dict(cached)
+        
+        tweet_data = await self._extract_tweet_content(tweet_url)
+        
+        # Only cache real content, not the "could not extract"/error placeholders
+        content = tweet_data.get("content", "") if tweet_data else ""
+        if content and not content.startswith(("Could not extract tweet content", "Error extracting tweet content")):
+            _tweet_cache.set(key, dict(tweet_data))
+        return tweet_data
+    
+    async def _extract_tweet_content(self, tweet_url):
         """Extract tweet content from Twitter/X URL using multiple methods."""
         # Try with Playwright first (highest success rate)
         playwright_result = await self.extract_with_playwright(tweet_url)
@@ -327,12 +1117,6 @@ class OpenAIHandler:
         
         # Fallback to previous methods if Playwright fails
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept': 'text/html,application/xhtml+xml,application/xml'
-            }
-            
             # Try several Nitter instances as they can be unreliable
             # Each instance might have different blocking/rate limiting
             nitter_instances = [
@@ -345,96 +1129,55 @@ class OpenAIHandler:
             ]
             
             tweet_id = None
-            tweet_id_match = re.search(r'/status/(\d+)', tweet_url)
+            tweet_id_match = _STATUS_RE.search(tweet_url)
             if tweet_id_match:
                 tweet_id = tweet_id_match.group(1)
                 logger.info(f"Found tweet ID: {tweet_id}")
             
-            # Try each Nitter instance
-            for instance in nitter_instances:
+            async def probe(instance):
+                """Fetch and parse the tweet from one Nitter instance, None if that fails."""
                 try:
                     nitter_url = f"https://{instance}/i/status/{tweet_id}" if tweet_id else tweet_url.replace("twitter.com", instance).replace("x.com", instance)
                     
                     logger.info(f"Attempting to extract content from: {nitter_url}")
-                    response = requests.get(nitter_url, headers=headers, timeout=10)
+                    response = await self._get_http_client().get(nitter_url)
                     
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.text, 'html.parser')
-                        
-                        # For Nitter, this is the selector for tweet content
-                        tweet_content_element = soup.select_one('.tweet-content')
-                        if tweet_content_element:
-                            tweet_content = tweet_content_element.get_text().strip()
-                            
-                            # Get author information
-                            author_element = soup.select_one('.fullname')
-                            author = author_element.get_text().strip() if author_element else "Unknown"
-                            
-                            # Get timestamp
-                            time_element = soup.select_one('.tweet-date a')
-                            timestamp = time_element.get_text().strip() if time_element else ""
-                            
-                            # Get tweet images if any
-                            images = []
-                            image_elements = soup.select('.attachment .still-image')
-                            for img in image_elements:
-                                if img.get('src'):
-                                    images.append(img['src'])
-                            
-                            # Get tweet stats
-                            stats = {}
-                            stat_elements = soup.select('.tweet-stats .icon-container')
-                            for stat in stat_elements:
-                                text = stat.get_text().strip()
-                                if "reply" in text.lower():
-                                    stats["replies"] = text.split()[0]
-                                elif "retweet" in text.lower():
-                                    stats["retweets"] = text.split()[0]
-                                elif "like" in text.lower():
-                                    stats["likes"] = text.split()[0]
-                            
-                            tweet_data = {
-                                "content": tweet_content,
-                                "author": author,
-                                "timestamp": timestamp,
-                                "images": images,
-                                "stats": stats,
-                                "url": tweet_url
-                            }
-                            
-                            logger.info(f"Successfully extracted tweet content from {instance}: {tweet_content[:100]}...")
+                        tweet_data = await asyncio.to_thread(_parse_nitter_page, response.text, tweet_url)
+                        if tweet_data:
+                            logger.info(f"Successfully extracted tweet content from {instance}: {tweet_data['content'][:100]}...")
                             return tweet_data
                 except Exception as e:
                     logger.warning(f"Failed to extract from {instance}: {e}")
-                    continue
+                return None
+            
+            # Ask all Nitter instances at once and use the first one that answers with the tweet
+            probes = [asyncio.create_task(probe(instance)) for instance in nitter_instances]
+            try:
+                for next_probe in asyncio.as_completed(probes):
+                    tweet_data = await next_probe
+                    if tweet_data:
+                        return tweet_data
+            finally:
+                for task in probes:
+                    task.cancel()
             
             # If Nitter instances all fail, try directly with Twitter/X
             logger.info(f"All Nitter instances failed, attempting direct Twitter/X extraction from: {tweet_url}")
             try:
-                response = requests.get(tweet_url, headers=headers, timeout=10)
+                response = await self._get_http_client().get(tweet_url)
                 
                 if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    
-                    # Try various selectors that might work for Twitter
-                    for selector in ['article div[lang]', '[data-testid="tweetText"]', '.tweet-text']:
-                        content_element = soup.select_one(selector)
-                        if content_element:
-                            return {
-                                "content": content_element.get_text().strip(),
-                                "author": "Unknown",
-                                "timestamp": "",
-                                "images": [],
-                                "stats": {},
-                                "url": tweet_url
-                            }
+                    tweet_data = await asyncio.to_thread(_parse_twitter_page, response.text, tweet_url)
+                    if tweet_data:
+                        return tweet_data
             except Exception as e:
                 logger.warning(f"Direct Twitter extraction failed: {e}")
             
             # If we got here, extraction failed
             logger.warning(f"Failed to extract tweet content from {tweet_url}")
             return {
-                "content": "Could not extract tweet content. Twitter may have blocked the request.",
+                "content": _TWEET_NOT_EXTRACTED,
                 "author": "Unknown",
                 "timestamp": "",
                 "images": [],
@@ -459,184 +1202,199 @@ class OpenAIHandler:
             # First extract the tweet content
             tweet_data = await self.extract_tweet_content(tweet_url)
             
-            # If extraction failed completely, try to get data from tweet ID
-            if tweet_data["content"] == "Could not extract tweet content. Twitter may have blocked the request.":
-                logger.warning("Using fallback method to get tweet info from tweet ID")
-                
-                # Extract the tweet ID from the URL
-                tweet_id_match = re.search(r'/status/(\d+)', tweet_url)
-                if tweet_id_match:
-                    tweet_id = tweet_id_match.group(1)
-                    
-                    # Extract the username from the URL
-                    username_match = re.search(r'(?:twitter|x)\.com/([^/]+)/', tweet_url)
-                    username = username_match.group(1) if username_match else "Unknown"
-                    
-                    # Add this basic info to help the AI make better guesses
-                    tweet_data["username"] = username
-                    tweet_data["tweet_id"] = tweet_id
-            
             # Format the tweet information for OpenAI
-            tweet_prompt = f"""Tweet URL: {tweet_url}
-Author: {tweet_data.get('author', 'Unknown')}
-Timestamp: {tweet_data.get('timestamp', '')}
-Content: {tweet_data.get('content', 'Not available')}
-Images: {"Yes, " + str(len(tweet_data.get('images', []))) + " images" if tweet_data.get('images', []) else "No images"}
-Stats: {json.dumps(tweet_data.get('stats', {})) if tweet_data.get('stats', {}) else "Not available"}
-"""
-
-            # Add any extra context if we couldn't extract the content
-            if tweet_data.get("content") == "Could not extract tweet content. Twitter may have blocked the request.":
-                tweet_prompt += f"""
-Note: The tweet content could not be directly extracted.
-Username: {tweet_data.get('username', 'Unknown')}
-Tweet ID: {tweet_data.get('tweet_id', 'Unknown')}
-
-Please make your best guess about the content based on the URL, username, and any other available information.
-"""
+            tweet_prompt = _tweet_prompt(tweet_url, tweet_data)
             
-            logger.info(f"Sending tweet data to OpenAI: {tweet_prompt[:200]}...")
+            # Lazy %-formatting: the preview is only cut (by %.200s) if INFO is logged
+            logger.info("Sending tweet data to OpenAI: %.200s...", tweet_prompt)
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": """You are a helpful assistant that analyzes Twitter/X posts.
-Preferred categories to choose from are:
-- VibeCoding Help (for programming, coding, development related content)
-- Cool AI (for AI, machine learning, LLMs, models, etc.)
-- Ecommerce (for online stores, marketplaces, shopping)
-- Business Ideas (for startups, entrepreneurship, business opportunities)
-- Cool Tool (for productivity tools, utilities, services)
-- App Idea (for mobile apps, application concepts)
-- Ios Development (for iOS specific development)
-
-If you don't have enough information about the tweet, make educated guesses based on the username, tweet ID, and URL. 
-For example, if the username suggests they're a tech person or company, it's likely technology-related content.
-
-You may suggest a new category if none of these fit well."""},
-                    {"role": "user", "content": f"""Analyze this tweet:
-
-{tweet_prompt}
-
-Provide the following in JSON format:
-1. title: A catchy title for this tweet
-2. category: The most relevant category from the preferred list (or suggest a new one if needed)
-3. summary: A concise summary of the tweet content
-4. key_points: List 3-5 bullet points that capture the main ideas of the tweet
-5. action_items: 2-3 possible follow-up actions or next steps based on the tweet's content
-6. personal_reflection: How this tweet's content could be applied to business or personal life (1-2 sentences)
-7. importance: Rate the importance/significance from 1-10, where 10 is extremely important
-8. emoji: A single emoji that best represents this tweet's content or purpose
-9. confident: Boolean indicating if you're confident in your analysis (false if working with limited information)"""}
+            request = {
+                "messages": [
+                    {"role": "system", "content": _TWEET_SYSTEM_PROMPT},
+                    {"role": "user", "content": _TWEET_USER_TEMPLATE.format(prompt=tweet_prompt)}
                 ],
-                response_format={"type": "json_object"}
-            )
-            result = response.choices[0].message.content
-            # Parse JSON to ensure it's valid
-            data = json.loads(result)
+                "response_format": _TWEET_RESPONSE_FORMAT,
+                "max_tokens": OPENAI_COMPLETION_TOKENS,
+                "temperature": OPENAI_TEMPERATURE
+            }
+            model_used = OPENAI_MODEL_FAST
+            data = await self._chat_json(model=model_used, **request)
+            
+            # When the fast model isn't confident, ask the stronger one the same question
+            if data.get("confident") is False and OPENAI_MODEL_STRONG != OPENAI_MODEL_FAST:
+                logger.info(f"{OPENAI_MODEL_FAST} was not confident about {tweet_url}, retrying with {OPENAI_MODEL_STRONG}")
+                model_used = OPENAI_MODEL_STRONG
+                data = await self._chat_json(model=model_used, **request)
             
             # Add original tweet data for reference
             data["extracted_tweet"] = tweet_data
+            data["model_used"] = model_used
             
             return data
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parsing OpenAI response as JSON: {e}")
+        except Exception as e:
+            logger.error(f"Error with OpenAI API: {e}")
+            return None
+    
+    async def analyze_tweets_batch(self, tweet_urls):
+        """Analyze several tweet URLs with one OpenAI call; returns one result (or None) per URL."""
+        tweet_urls = list(tweet_urls)
+        if not tweet_urls:
+            return []
+        if len(tweet_urls) > TWEET_BATCH_MAX_SIZE:
+            logger.error(f"Batch of {len(tweet_urls)} tweets is larger than {TWEET_BATCH_MAX_SIZE}, not sending it")
+            return None
+        
+        try:
+            # Extract all the tweets at once; the extractions don't depend on each other
+            tweets = await asyncio.gather(*(self.extract_tweet_content(url) for url in tweet_urls))
+            
+            # Number the tweets so each result can be matched back to its URL
+            tweet_prompts = "\n".join(
+                f"[{index}]\n{_tweet_prompt(url, tweet_data)}"
+                for index, (url, tweet_data) in enumerate(zip(tweet_urls, tweets), start=1)
+            )
+            
+            # Each output token costs as much room as an input one, so budget the answers too
+            if len(tweet_prompts) + len(tweet_urls) * TWEET_RESULT_CHARS > TWEET_BATCH_MAX_CHARS:
+                logger.error(f"Batch of {len(tweet_urls)} tweets is over the {TWEET_BATCH_MAX_CHARS} character budget, not sending it")
+                return None
+            
+            logger.info(f"Sending {len(tweet_urls)} tweets to OpenAI in one request")
+            
+            data = await self._chat_json(
+                model=OPENAI_MODEL_FAST,
+                messages=[
+                    {"role": "system", "content": _TWEET_BATCH_SYSTEM_PROMPT},
+                    {"role": "user", "content": _TWEET_BATCH_USER_TEMPLATE.format(prompts=tweet_prompts)}
+                ],
+                response_format=_TWEET_BATCH_RESPONSE_FORMAT,
+                max_tokens=OPENAI_COMPLETION_TOKENS * len(tweet_urls),
+                temperature=OPENAI_TEMPERATURE
+            )
+            results = data["results"]
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            logger.error(f"Error parsing OpenAI batch response as JSON: {e}")
             return None
         except Exception as e:
             logger.error(f"Error with OpenAI API: {e}")
             return None
+        
+        # Put each result back in the position of its tweet; tweets without one get None
+        analyses = _match_batch_results(results, len(tweet_urls))
+        for data, tweet_data in zip(analyses, tweets):
+            if data is not None:
+                data["extracted_tweet"] = tweet_data
+                data["model_used"] = OPENAI_MODEL_FAST
+        return analyses
             
     async def close(self):
-        """Close the Playwright browser if open."""
-        global playwright_initialized
+        """Stop prefetching and close the Playwright browser and the HTTP client if open."""
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            try:
+                await self._prefetch_task
+            except asyncio.CancelledError:
+                pass
+            self._prefetch_task = None
+        
+        if self._httpx is not None:
+            try:
+                await self._httpx.aclose()
+            except Exception as e:
+                logger.error(f"Error closing HTTP client: {e}")
+            self._httpx = None
+        
+        for context in (self._tweet_context, self._website_context):
+            if context is not None:
+                try:
+                    await context.close()
+                except Exception as e:
+                    logger.error(f"Error closing browser context: {e}")
+        self._tweet_context = None
+        self._website_context = None
+        
         if self.browser:
             try:
                 await self.browser.close()
                 logger.info("Closed Playwright browser")
             except Exception as e:
                 logger.error(f"Error closing browser: {e}")
+            self.browser = None
                 
         if self.playwright:
             try:
                 await self.playwright.stop()
                 logger.info("Stopped Playwright")
-                playwright_initialized = False
             except Exception as e:
                 logger.error(f"Error stopping Playwright: {e}")
+            self.playwright = None
     
     async def extract_website_content(self, url):
+        """Extract content from a general website, reusing a recent result for the same page."""
+        key = _cache_key(url)
+        cached = _website_cache.get(key)
+        if cached is not None:
+            logger.info(f"Using cached website content for {url}")
+            return dict(cached)
+        
+        website_data = await self._extract_website_content(url)
+        
+        # Only cache successful extractions
+        if website_data and not (website_data.get("content") or "").startswith("Error extracting content"):
+            _website_cache.set(key, dict(website_data))
+        return website_data
+    
+    async def _extract_website_content(self, url):
         """Extract content from a general website."""
         if not await self.init_playwright():
             return None
         
         try:
-            context = await self.browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            )
-            page = await context.new_page()
-            
-            # Set longer timeout
-            page.set_default_timeout(30000)
-            
-            logger.info(f"Navigating to website URL: {url}")
-            await page.goto(url, wait_until="domcontentloaded")
-            
-            # Wait for content to load
-            await asyncio.sleep(2)
-            
-            # Extract title
-            title = await page.title()
-            
-            # Extract meta description
-            description = ""
-            desc_element = await page.query_selector('meta[name="description"]')
-            if desc_element:
-                description = await desc_element.get_attribute('content') or ""
-            
-            # Extract main content
-            # We'll try several common content selectors
-            content = ""
-            for selector in [
-                'main', 
-                'article', 
-                '#content', 
-                '.content', 
-                'body'
-            ]:
+            # The page is closed however this ends, including early returns and errors
+            async with await self._website_context.new_page() as page:
+                # Set longer timeout
+                page.set_default_timeout(30000)
+                
+                logger.info(f"Navigating to website URL: {url}")
+                await page.goto(url, wait_until="domcontentloaded")
+                
+                # Wait (briefly) for a main content element, for pages that render it with JS
                 try:
-                    if await page.locator(selector).count() > 0:
-                        content_element = await page.locator(selector).first
-                        content = await page.locator(selector).inner_text()
-                        if content:
-                            logger.info(f"Found content with selector: {selector}")
-                            break
+                    await page.wait_for_selector(WEBSITE_CONTENT_SELECTOR, state="attached", timeout=5000)
                 except Exception:
-                    continue
-            
-            # Take a screenshot for debugging
-            try:
-                await page.screenshot(path="website_screenshot.png")
-                logger.info("Saved screenshot to website_screenshot.png")
-            except Exception as e:
-                logger.error(f"Error saving screenshot: {e}")
-            
-            # If we couldn't get content from selectors, get the full body text
-            if not content:
-                content = await page.inner_text('body')
+                    logger.debug(f"No main content element on {url}, using what's there")
+                
+                # Extract title
+                title = await page.title()
+                
+                # Extract the meta description and main content in one in-page call,
+                # trying several common content selectors
+                found = await page.evaluate(_FIRST_MATCH_JS, _WEBSITE_SELECTORS)
+                description = found["description"]["text"] if found["description"] else ""
+                content = ""
+                if found["content"]:
+                    content = found["content"]["text"]
+                    logger.info(f"Found content with selector: {found['content']['selector']}")
+                
+                # Take a screenshot, only when debugging
+                if _save_debug_files():
+                    try:
+                        await page.screenshot(path="website_screenshot.png")
+                        logger.info("Saved screenshot to website_screenshot.png")
+                    except Exception as e:
+                        logger.error(f"Error saving screenshot: {e}")
+                
+                # The page already cut the text to one character over the limit, if it was longer
+                if len(content) > WEBSITE_CONTENT_MAX_CHARS:
+                    content = content[:WEBSITE_CONTENT_MAX_CHARS] + "... [content truncated]"
+                
+                return {
+                    "title": title or "Unknown Title",
+                    "description": description,
+                    "content": content,
+                    "url": url
+                }
                 
-            # Limit content size to avoid token limits
-            if content and len(content) > 8000:
-                content = content[:8000] + "... [content truncated]"
-            
-            await context.close()
-            
-            return {
-                "title": title or "Unknown Title",
-                "description": description,
-                "content": content,
-                "url": url
-            }
-            
         except Exception as e:
             logger.error(f"Error extracting website content: {e}")
             return {
@@ -648,54 +1406,96 @@ Provide the following in JSON format:
     
     async def analyze_website(self, website_url):
         """Analyze a general website with OpenAI."""
+        # Prefetching waits while any analysis the user asked for is running
+        self._analyses_running += 1
+        self._idle.clear()
+        try:
+            return await self._analyze_website(website_url)
+        finally:
+            self._analyses_running -= 1
+            if not self._analyses_running:
+                self._idle.set()
+    
+    def _queue_prefetch(self, website_url, text):
+        """Queue links to other pages of the same site found in text, for the prefetch worker."""
+        host = urlsplit(website_url).netloc
+        queued = 0
+        for link in _LINK_RE.findall(text):
+            link = link.rstrip(".,;:!?")
+            if urlsplit(link).netloc != host or link == website_url or link in self._prefetch_seen:
+                continue
+            # Skip pages extracted recently, whose analysis is cached already
+            if _website_cache.get(_cache_key(link)) is not None:
+                continue
+            try:
+                self._prefetch_queue.put_nowait(link)
+            except asyncio.QueueFull:
+                break
+            self._prefetch_seen.add(link)
+            queued += 1
+            if queued >= WEBSITE_PREFETCH_LINKS:
+                break
+        
+        if queued and (self._prefetch_task is None or self._prefetch_task.done()):
+            self._prefetch_task = asyncio.create_task(self._prefetch_worker())
+    
+    async def _prefetch_worker(self):
+        """Analyze queued links one at a time, whenever no foreground analysis is running."""
+        while True:
+            link = await self._prefetch_queue.get()
+            try:
+                await self._idle.wait()
+                logger.info(f"Prefetching analysis of {link}")
+                await self._analyze_website(link, prefetch=True)
+            finally:
+                self._prefetch_queue.task_done()
+    
+    async def _analyze_website(self, website_url, prefetch=False):
+        """Analyze a general website with OpenAI, queueing its links for prefetching unless this is a prefetch."""
         try:
             # First extract the website content
             website_data = await self.extract_website_content(website_url)
             
+            # Only pages the user asked for lead to prefetching, so it never crawls further
+            if WEBSITE_PREFETCH_LINKS and not prefetch:
+                self._queue_prefetch(website_url, website_data['content'])
+            
             # Format the website information for OpenAI
-            website_prompt = f"""Website URL: {website_url}
-Title: {website_data['title']}
-Description: {website_data['description']}
-
-Content Preview:
-{website_data['content'][:4000]}
-"""
+            website_prompt = _website_prompt(website_url, website_data)
             
-            logger.info(f"Sending website data to OpenAI: {website_prompt[:200]}...")
+            # Reuse the analysis of the same page, or of a nearly identical page of the same site.
+            # A failed or empty extraction says nothing about the page, so it's never cached.
+            extracted = _website_extracted(website_data)
+            host = urlsplit(website_url).netloc
+            key = hashlib.sha256(f"{website_url}\n{website_data['content'][:4000]}".encode()).hexdigest()
+            data = None
+            embedding = None
+            if extracted:
+                data = await asyncio.to_thread(_website_analyses.get, key)
+                if data is None:
+                    embedding = await self._embed(website_prompt)
+                    if embedding is not None:
+                        data = await asyncio.to_thread(_website_analyses.get_similar, embedding, host)
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": """You are a helpful assistant that analyzes websites and tools.
-Preferred categories to choose from are:
-- VibeCoding Help (for programming, coding, development related content)
-- Cool AI (for AI, machine learning, LLMs, models, etc.)
-- Ecommerce (for online stores, marketplaces, shopping)
-- Business Ideas (for startups, entrepreneurship, business opportunities)
-- Cool Tool (for productivity tools, utilities, services)
-- App Idea (for mobile apps, application concepts)
-- Ios Development (for iOS specific development)
-
-You may suggest a new category if none of these fit well."""},
-                    {"role": "user", "content": f"""Analyze this website:
-
-{website_prompt}
-
-Provide the following information in JSON format:
-1. title: A clear, concise title for this website or tool
-2. category: The most relevant category from the preferred list (or suggest a new one if needed)
-3. type: Classify this as either "Tool", "Resource", "App", "Service", or "Other"
-4. description: A detailed description of what this website or tool does and what problems it solves
-5. use_cases: List 2-3 primary use cases for this website/tool
-6. alternatives: If you know similar tools/websites, list 1-2 alternatives
-7. author: The creator, company, or individual who made this tool/website (if identifiable, otherwise "Unknown")
-8. emoji: A single emoji that best represents this website or tool's purpose/category"""}
-                ],
-                response_format={"type": "json_object"}
-            )
-            result = response.choices[0].message.content
-            # Parse JSON to ensure it's valid
-            data = json.loads(result)
+            if data is None:
+                logger.info("Sending website data to OpenAI: %.200s...", website_prompt)
+                
+                model_used = OPENAI_MODEL_FAST
+                data = await self._chat_json(**_website_request(website_prompt))
+                
+                # When the fast model's answer is unusable or unsure, ask the stronger one (unless
+                # there was no page content to analyze, which no model can make up for)
+                if extracted and not _website_analysis_ok(data) and OPENAI_MODEL_STRONG != OPENAI_MODEL_FAST:
+                    logger.info(f"{OPENAI_MODEL_FAST} was not confident about {website_url}, retrying with {OPENAI_MODEL_STRONG}")
+                    model_used = OPENAI_MODEL_STRONG
+                    data = await self._chat_json(**_website_request(website_prompt, model=model_used))
+                data["model_used"] = model_used
+                
+                # Cached after any escalation, so the stronger answer is the one reused
+                if extracted:
+                    await asyncio.to_thread(_website_analyses.add, key, host, embedding, data)
+            else:
+                logger.info(f"Using cached analysis for {website_url}")
             
             # Add original website data for reference
             data["extracted_content"] = {
@@ -704,9 +1504,168 @@ Provide the following information in JSON format:
             }
             
             return data
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parsing OpenAI response as JSON: {e}")
+        except Exception as e:
+            logger.error(f"Error with OpenAI API: {e}")
             return None
+    
+    async def analyze_websites_batch(self, website_urls):
+        """Analyze several websites concurrently; returns one result (or None) per URL, in order."""
+        # Each analysis waits for the OpenAI semaphore, so this stays within OPENAI_MAX_CONCURRENT
+        return await asyncio.gather(*(self.analyze_website(url) for url in website_urls))
+    
+    async def analyze_websites_multi(self, website_urls):
+        """Analyze several websites in as few OpenAI calls as the budget allows; one result (or None) per URL."""
+        website_urls = list(website_urls)
+        if not website_urls:
+            return []
+        
+        # Extract all the websites at once; the extractions don't depend on each other
+        websites = await asyncio.gather(*(self.extract_website_content(url) for url in website_urls))
+        # Websites that couldn't be extracted at all (e.g. the browser didn't start) keep None
+        prompts = {
+            position: _website_prompt(url, website_data)
+            for position, (url, website_data) in enumerate(zip(website_urls, websites))
+            if website_data is not None
+        }
+        
+        # Group consecutive websites into requests whose prompts and answers fit the budget
+        groups = []
+        group_chars = 0
+        for position, prompt in prompts.items():
+            chars = len(prompt) + WEBSITE_RESULT_CHARS
+            if not groups or group_chars + chars > WEBSITE_BATCH_MAX_CHARS:
+                groups.append([])
+                group_chars = 0
+            groups[-1].append(position)
+            group_chars += chars
+        
+        group_results = await asyncio.gather(*(
+            self._analyze_website_group([prompts[position] for position in group]) for group in groups
+        ))
+        
+        analyses = [None] * len(website_urls)
+        for group, results in zip(groups, group_results):
+            for position, data in zip(group, results):
+                if data is not None:
+                    # Add original website data for reference
+                    data["extracted_content"] = {
+                        "title": websites[position]['title'],
+                        "description": websites[position]['description']
+                    }
+                    analyses[position] = data
+        return analyses
+    
+    async def _analyze_website_group(self, prompts):
+        """Analyze the websites described by the prompts in one OpenAI call; one result (or None) each."""
+        sites = "\n".join(f"---SITE {number}---\n{prompt}" for number, prompt in enumerate(prompts, start=1))
+        
+        logger.info(f"Sending {len(prompts)} websites to OpenAI in one request")
+        
+        try:
+            data = await self._chat_json(
+                model=OPENAI_MODEL_FAST,
+                messages=[
+                    {"role": "system", "content": _WEBSITE_SYSTEM_PROMPT},
+                    {"role": "user", "content": _WEBSITE_BATCH_USER_TEMPLATE.format(sites=sites)}
+                ],
+                response_format=_WEBSITE_BATCH_RESPONSE_FORMAT,
+                max_tokens=OPENAI_COMPLETION_TOKENS * len(prompts),
+                temperature=OPENAI_TEMPERATURE
+            )
+            results = data["results"]
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            logger.error(f"Error parsing OpenAI batch response as JSON: {e}")
+            return [None] * len(prompts)
         except Exception as e:
             logger.error(f"Error with OpenAI API: {e}")
-            return None 
\ No newline at end of file
+            return [None] * len(prompts)
+        
+        return _match_batch_results(results, len(prompts))
+    
+    async def analyze_websites_via_batch_api(self, website_urls, out_path=None):
+        """Analyze websites through the OpenAI Batch API (half price, done within 24h); one result (or None) per URL."""
+        # For backfills and other bulk runs only, since this waits until the whole batch is done;
+        # with out_path, the analyses are also saved there as JSON lines ({"url", "analysis"})
+        website_urls = list(website_urls)
+        if not website_urls:
+            return []
+        
+        # Extract all the websites at once; the extractions don't depend on each other
+        websites = await asyncio.gather(*(self.extract_website_content(url) for url in website_urls))
+        
+        # One request per website, identified by a hash of its position and URL; websites that
+        # couldn't be extracted at all (e.g. the browser didn't start) get no request and None
+        custom_ids = [
+            hashlib.sha256(f"{position}:{url}".encode()).hexdigest() if website_data is not None else None
+            for position, (url, website_data) in enumerate(zip(website_urls, websites))
+        ]
+        lines = "".join(
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": _website_request(_website_prompt(url, website_data))
+            }) + "\n"
+            for custom_id, url, website_data in zip(custom_ids, website_urls, websites)
+            if custom_id is not None
+        )
+        if not lines:
+            logger.error(f"None of the {len(website_urls)} websites could be extracted, not starting a batch")
+            return [None] * len(website_urls)
+        
+        try:
+            batch_file = await self.client.files.create(file=("websites.jsonl", lines.encode()), purpose="batch")
+            batch = await self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            logger.info(f"Started OpenAI batch {batch.id} for {len(website_urls)} websites")
+            
+            while batch.status not in _BATCH_FINAL_STATES:
+                await asyncio.sleep(BATCH_POLL_INTERVAL)
+                batch = await self.client.batches.retrieve(batch.id)
+            
+            if batch.status != "completed" or not batch.output_file_id:
+                logger.error(f"OpenAI batch {batch.id} ended as {batch.status}")
+                return [None] * len(website_urls)
+            
+            output = await self.client.files.content(batch.output_file_id)
+        except Exception as e:
+            logger.error(f"Error with OpenAI Batch API: {e}")
+            return [None] * len(website_urls)
+        
+        # Results come back in any order, so match them by custom_id
+        results = {}
+        for line in output.text.splitlines():
+            try:
+                result = _json_loads(line)
+                body = result["response"]["body"]
+                results[result["custom_id"]] = _json_loads(body["choices"][0]["message"]["content"])
+            except (json.JSONDecodeError, KeyError, IndexError, TypeError) as e:
+                logger.warning(f"Skipping unreadable batch result: {e}")
+        
+        analyses = []
+        for custom_id, website_data in zip(custom_ids, websites):
+            data = results.get(custom_id)
+            if data is not None and website_data is not None:
+                # Add original website data for reference
+                data["extracted_content"] = {
+                    "title": website_data['title'],
+                    "description": website_data['description']
+                }
+            analyses.append(data)
+        
+        missing = analyses.count(None)
+        if missing:
+            logger.warning(f"OpenAI batch returned no analysis for {missing} of {len(website_urls)} websites")
+        
+        if out_path:
+            try:
+                with open(out_path, "w") as file:
+                    for url, data in zip(website_urls, analyses):
+                        file.write(json.dumps({"url": url, "analysis": data}) + "\n")
+            except OSError as e:
+                logger.error(f"Could not write batch analyses to {out_path}: {e}")
+        
+        return analyses
\ No newline at end of file
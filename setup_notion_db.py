@@ -5,38 +5,27 @@ Utility script to create a Notion database with the required structure for the X
 import os
 import sys
 import logging
-from notion_client import Client
+import concurrent.futures
+from env_loader import load_env_file, get_notion_client
 
 # Set up logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables manually
-def load_env_file():
-    """Load environment variables from .env file manually."""
-    try:
-        with open(".env", "r") as file:
-            for line in file:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                key, value = line.split('=', 1)
-                key = key.strip()
-                value = value.strip()
-                
-                # Set it in the environment
-                os.environ[key] = value
-        
-        logger.info("Successfully loaded environment variables from .env file")
-    except Exception as e:
-        logger.error(f"Error loading .env file: {e}")
-
 # Load environment variables
 load_env_file()
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
 NOTION_PARENT_PAGE_ID = os.getenv("NOTION_PARENT_PAGE_ID")  # ID of the page where you want to create the database
 
+ENV_FILE = ".env"
+
+def _env_has_database_id(env_file):
+    """Whether env_file already sets NOTION_DATABASE_ID (None if there is no such file)."""
+    if not os.path.exists(env_file):
+        return None
+    with open(env_file, "r") as f:
+        return any(line.startswith(("NOTION_DATABASE_ID=", "NOTION_DATABASE_ID =")) for line in f)
+
 def create_notion_database():
     """Create a Notion database with the required structure for the X to Notion bot."""
     if not NOTION_API_KEY:
@@ -49,44 +38,48 @@ def create_notion_database():
     
     try:
         # Initialize Notion client
-        notion = Client(auth=NOTION_API_KEY)
+        notion = get_notion_client(NOTION_API_KEY)
         
-        # Create the database
-        response = notion.databases.create(
-            parent={"type": "page_id", "page_id": NOTION_PARENT_PAGE_ID},
-            title=[{"type": "text", "text": {"content": "Twitter/X Posts"}}],
-            properties={
-                "Title": {
-                    "title": {}
-                },
-                "URL": {
-                    "url": {}
-                },
-                "Category": {
-                    "select": {
-                        "options": [
-                            {"name": "Technology", "color": "blue"},
-                            {"name": "Politics", "color": "red"},
-                            {"name": "Entertainment", "color": "purple"},
-                            {"name": "Business", "color": "green"},
-                            {"name": "Sports", "color": "orange"},
-                            {"name": "Science", "color": "pink"},
-                            {"name": "Health", "color": "yellow"},
-                            {"name": "Other", "color": "gray"}
-                        ]
+        # Create the database and check the .env file at the same time
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            env_check = executor.submit(_env_has_database_id, ENV_FILE)
+            database_job = executor.submit(
+                notion.databases.create,
+                parent={"type": "page_id", "page_id": NOTION_PARENT_PAGE_ID},
+                title=[{"type": "text", "text": {"content": "Twitter/X Posts"}}],
+                properties={
+                    "Title": {
+                        "title": {}
+                    },
+                    "URL": {
+                        "url": {}
+                    },
+                    "Category": {
+                        "select": {
+                            "options": [
+                                {"name": "Technology", "color": "blue"},
+                                {"name": "Politics", "color": "red"},
+                                {"name": "Entertainment", "color": "purple"},
+                                {"name": "Business", "color": "green"},
+                                {"name": "Sports", "color": "orange"},
+                                {"name": "Science", "color": "pink"},
+                                {"name": "Health", "color": "yellow"},
+                                {"name": "Other", "color": "gray"}
+                            ]
+                        }
+                    },
+                    "Summary": {
+                        "rich_text": {}
+                    },
+                    "Importance": {
+                        "number": {}
+                    },
+                    "Date Added": {
+                        "created_time": {}
                     }
-                },
-                "Summary": {
-                    "rich_text": {}
-                },
-                "Importance": {
-                    "number": {}
-                },
-                "Date Added": {
-                    "created_time": {}
                 }
-            }
-        )
+            )
+        response = database_job.result()
         
         # Log success
         database_id = response["id"]
@@ -97,17 +90,13 @@ def create_notion_database():
         logger.info(f"Database URL: {database_url}")
         
         # Add to .env file if it exists
-        env_file = ".env"
-        if os.path.exists(env_file):
-            with open(env_file, "r") as f:
-                env_contents = f.read()
-            
-            if "NOTION_DATABASE_ID" not in env_contents:
-                with open(env_file, "a") as f:
-                    f.write(f"\nNOTION_DATABASE_ID={database_id}\n")
-                logger.info(f"Added NOTION_DATABASE_ID to {env_file}")
-            else:
-                logger.warning(f"NOTION_DATABASE_ID already exists in {env_file}. Not updating.")
+        has_database_id = env_check.result()
+        if has_database_id is False:
+            with open(ENV_FILE, "a") as f:
+                f.write(f"\nNOTION_DATABASE_ID={database_id}\n")
+            logger.info(f"Added NOTION_DATABASE_ID to {ENV_FILE}")
+        elif has_database_id:
+            logger.warning(f"NOTION_DATABASE_ID already exists in {ENV_FILE}. Not updating.")
         
         print("\n======= SETUP COMPLETE =======")
         print(f"Your Notion database is ready at: {database_url}")
@@ -2,34 +2,12 @@
 import os
 import sys
 import logging
-from notion_client import Client
+from env_loader import load_env_file, get_notion_client
 
 # Set up logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables manually
-def load_env_file():
-    """Load environment variables from .env file manually."""
-    try:
-        with open(".env", "r") as file:
-            for line in file:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                if '=' in line:
-                    key, value = line.split('=', 1)
-                    key = key.strip()
-                    value = value.strip()
-                    
-                    # Set it in the environment
-                    os.environ[key] = value
-        
-        logger.info("Successfully loaded environment variables from .env file")
-    except Exception as e:
-        logger.error(f"Error loading .env file: {e}")
-
 # Load environment variables
 load_env_file()
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
@@ -42,7 +20,7 @@ def test_notion_connection():
     
     try:
         # Initialize Notion client
-        notion = Client(auth=NOTION_API_KEY)
+        notion = get_notion_client(NOTION_API_KEY)
         
         # Try listing users
         response = notion.users.list()
@@ -5,45 +5,13 @@ Test script to check access to a Notion database.
 import os
 import sys
 import logging
-from notion_client import Client
+from env_loader import load_env_file, get_notion_client
+from format_notion_id import format_notion_id
 
 # Set up logging
 logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables manually
-def load_env_file():
-    """Load environment variables from .env file manually."""
-    try:
-        with open(".env", "r") as file:
-            for line in file:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                if '=' in line:
-                    key, value = line.split('=', 1)
-                    key = key.strip()
-                    value = value.strip()
-                    
-                    # Set it in the environment
-                    os.environ[key] = value
-        
-        logger.info("Successfully loaded environment variables from .env file")
-    except Exception as e:
-        logger.error(f"Error loading .env file: {e}")
-
-# Format Notion ID with dashes if needed
-def format_notion_id(id_str):
-    """Format a Notion ID by inserting dashes in the correct positions."""
-    # Remove any existing dashes and non-hex characters
-    clean_id = ''.join(c for c in id_str if c.isalnum())
-    
-    # Insert dashes in the correct positions (8-4-4-4-12 format)
-    formatted_id = f"{clean_id[:8]}-{clean_id[8:12]}-{clean_id[12:16]}-{clean_id[16:20]}-{clean_id[20:]}"
-    
-    return formatted_id
-
 # Load environment variables
 load_env_file()
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
@@ -59,13 +27,20 @@ def test_database_access():
         logger.error("Missing NOTION_DATABASE_ID in .env file")
         return False
     
-    # Format database ID correctly
-    formatted_db_id = format_notion_id(NOTION_DATABASE_ID)
+    # Initialize Notion client
+    notion = get_notion_client(NOTION_API_KEY)
+    
+    # Format database ID correctly; a malformed one isn't worth asking Notion about
+    try:
+        formatted_db_id = format_notion_id(NOTION_DATABASE_ID)
+    except ValueError as e:
+        print(f"\n❌ {e}")
+        print("A database ID has 32 hexadecimal characters (dashes are optional).")
+        print("\nSearching for databases you have access to...")
+        list_accessible_databases(notion)
+        return False
     
     try:
-        # Initialize Notion client
-        notion = Client(auth=NOTION_API_KEY)
-        
         print(f"\nTesting access to Notion database: {formatted_db_id}")
         print("------------------------------------------------")
         
@@ -93,25 +68,27 @@ def test_database_access():
         print("  2. Make sure the database is shared with your integration")
         print("  3. If you haven't created the database yet, run setup_notion_db.py")
         print("\nTrying to search for databases you have access to...")
-        
-        try:
-            # List all the available pages
-            search_results = notion.search(filter={"property": "object", "value": "database"})
-            if search_results["results"]:
-                print("\nFound these databases accessible to your integration:")
-                for idx, db in enumerate(search_results["results"], 1):
-                    db_id = db["id"]
-                    db_title = db["title"][0]["plain_text"] if db["title"] else "Untitled"
-                    print(f"  {idx}. {db_title} (ID: {db_id})")
-                
-                print("\nYou can use one of these database IDs in your .env file.")
-            else:
-                print("\nNo databases found. Create a database with setup_notion_db.py")
-        except Exception as search_error:
-            logger.error(f"Error searching Notion: {search_error}")
-            print("Could not search for databases.")
-        
+        list_accessible_databases(notion)
         return False
 
+def list_accessible_databases(notion):
+    """Print the databases the integration can access."""
+    try:
+        # List all the available pages
+        search_results = notion.search(filter={"property": "object", "value": "database"})
+        if search_results["results"]:
+            print("\nFound these databases accessible to your integration:")
+            for idx, db in enumerate(search_results["results"], 1):
+                db_id = db["id"]
+                db_title = db["title"][0]["plain_text"] if db["title"] else "Untitled"
+                print(f"  {idx}. {db_title} (ID: {db_id})")
+            
+            print("\nYou can use one of these database IDs in your .env file.")
+        else:
+            print("\nNo databases found. Create a database with setup_notion_db.py")
+    except Exception as search_error:
+        logger.error(f"Error searching Notion: {search_error}")
+        print("Could not search for databases.")
+
 if __name__ == "__main__":
     test_database_access() 
\ No newline at end of file